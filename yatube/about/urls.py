@@ -1,10 +1,13 @@
 from django.urls import path
+
+from core.db.router import use_replica
 from . import views
 
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech'),
+    path('author/', use_replica(views.AboutAuthorView.as_view()),
+         name='author'),
+    path('tech/', use_replica(views.AboutTechView.as_view()), name='tech'),
 ]
@@ -0,0 +1,78 @@
+"""Сериализация моделей в словари для JSON API.
+
+Каждое поле ресурса знает, какие колонки ему нужны, поэтому при
+?fields= выборка читает только их и присоединяет только нужные таблицы.
+"""
+from collections import namedtuple
+
+from core.storage import is_private
+
+Field = namedtuple('Field', 'columns getter')
+
+
+def _image_url(post):
+    # необработанная загрузка закрыта, как и в шаблонах
+    if not post.image or is_private(post.image.name):
+        return None
+    return post.image.url
+
+
+POST_FIELDS = {
+    'id': Field((), lambda post: post.pk),
+    'text': Field(('text',), lambda post: post.text),
+    'pub_date': Field(('pub_date',), lambda post: post.pub_date),
+    'updated': Field(('updated',), lambda post: post.updated),
+    'author': Field(
+        ('author__username',), lambda post: post.author.username),
+    'group': Field(
+        ('group__slug',),
+        lambda post: post.group.slug if post.group_id else None),
+    'image': Field(('image',), _image_url),
+}
+
+GROUP_FIELDS = {
+    'id': Field((), lambda group: group.pk),
+    'title': Field(('title',), lambda group: group.title),
+    'slug': Field(('slug',), lambda group: group.slug),
+    'description': Field(
+        ('description',), lambda group: group.description),
+}
+
+COMMENT_FIELDS = {
+    'id': Field((), lambda comment: comment.pk),
+    'post': Field(('post_id',), lambda comment: comment.post_id),
+    'author': Field(
+        ('author__username',), lambda comment: comment.author.username),
+    'text': Field(('text',), lambda comment: comment.text),
+    'created': Field(('created',), lambda comment: comment.created),
+}
+
+
+class Resource:
+    """Набор запрошенных полей ресурса."""
+
+    def __init__(self, fields, requested=None):
+        names = [name for name in (requested or '').split(',') if name]
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(fields)}')
+        self.fields = {name: fields[name] for name in names or fields}
+
+    def prepare(self, queryset, ordering=()):
+        """Выборка только нужных колонок; ordering — поля пагинации."""
+        columns = {
+            column for field in self.fields.values()
+            for column in field.columns
+        }
+        columns.update(name.lstrip('-') for name in ordering)
+        columns.discard('pk')
+        related = {
+            column.split('__')[0] for column in columns if '__' in column
+        }
+        return queryset.select_related(None).select_related(
+            *related).only(*columns)
+
+    def serialize(self, obj):
+        return {name: field.getter(obj) for name, field in self.fields.items()}
@@ -0,0 +1,174 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from api.views import STREAM_THRESHOLD
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author,
+                 group=cls.group if number % 2 else None)
+            for number in range(25)
+        )
+        cls.post = Post.objects.order_by('pk').first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Ответ {number}')
+            for number in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_json(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return response.json()
+
+    def test_posts_cursor_walk(self):
+        """Курсоры next и previous обходят ленту без пропусков"""
+        url = reverse('api:posts')
+        seen = []
+        data = self.get_json(url, limit=10)
+        while True:
+            seen += [post['id'] for post in data['results']]
+            if data['next'] is None:
+                break
+            data = self.get_json(url, limit=10, cursor=data['next'])
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+        self.assertEqual(seen, expected)
+        back = self.get_json(url, limit=10, cursor=data['previous'])
+        self.assertEqual(
+            [post['id'] for post in back['results']], expected[10:20])
+
+    def test_sparse_fields(self):
+        """?fields= отдаёт только запрошенные поля без JOIN"""
+        url = reverse('api:posts')
+        with self.assertNumQueries(1):
+            data = self.get_json(url, fields='id,text', limit=5)
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        data = self.get_json(url, fields='id,author,group', limit=50)
+        post = Post.objects.order_by('-pub_date', '-pk').first()
+        self.assertEqual(data['results'][0], {
+            'id': post.pk,
+            'author': 'author',
+            'group': post.group.slug if post.group else None,
+        })
+
+    def test_unknown_field(self):
+        """Неизвестное поле в ?fields= — ошибка 400"""
+        data = self.get_json(reverse('api:posts'), status=400, fields='x')
+        self.assertIn('x', data['error'])
+
+    def test_bulk_ids(self):
+        """?ids= отдаёт посты в порядке запроса одним запросом"""
+        ids = list(Post.objects.values_list('pk', flat=True)[:3])[::-1]
+        with self.assertNumQueries(1):
+            data = self.get_json(
+                reverse('api:posts'),
+                ids=','.join(map(str, ids + [0])), fields='id')
+        self.assertEqual([post['id'] for post in data['results']], ids)
+        self.get_json(reverse('api:posts'), status=400, ids='1,a')
+        self.get_json(
+            reverse('api:posts'), status=400,
+            ids=','.join(map(str, range(1, 102))))
+
+    def test_filters(self):
+        """Посты фильтруются по группе и автору"""
+        data = self.get_json(reverse('api:posts'), group='group', limit=50)
+        self.assertEqual(len(data['results']), 12)
+        self.assertTrue(all(
+            post['group'] == 'group' for post in data['results']))
+        data = self.get_json(reverse('api:posts'), author='nobody')
+        self.assertEqual(data['results'], [])
+
+    def test_post_and_group_detail(self):
+        """Пост и группа отдаются по ключу, чужой — 404"""
+        data = self.get_json(reverse('api:post', args=(self.post.pk,)))
+        self.assertEqual(data['text'], self.post.text)
+        self.get_json(reverse('api:post', args=(0,)), status=404)
+        data = self.get_json(reverse('api:group', args=('group',)))
+        self.assertEqual(data['title'], 'Группа')
+        data = self.get_json(reverse('api:groups'))
+        self.assertEqual(
+            [group['slug'] for group in data['results']], ['group', 'other'])
+
+    def test_incoming_image_is_hidden(self):
+        """Необработанная загрузка не попадает в API"""
+        incoming = Post.objects.create(
+            text='Загрузка', author=self.author,
+            image='posts/incoming/photo.jpg')
+        processed = Post.objects.create(
+            text='Готово', author=self.author, image='posts/photo.jpg')
+        data = self.get_json(
+            reverse('api:post', args=(incoming.pk,)), fields='image')
+        self.assertIsNone(data['image'])
+        data = self.get_json(
+            reverse('api:post', args=(processed.pk,)), fields='image')
+        self.assertEqual(data['image'], processed.image.url)
+
+    def test_comments(self):
+        """Комментарии отдаются в обоих порядках с курсором"""
+        url = reverse('api:comments', args=(self.post.pk,))
+        data = self.get_json(url, fields='text')
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Ответ 0', 'Ответ 1', 'Ответ 2'])
+        data = self.get_json(url, fields='text', order='new', limit=2)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Ответ 2', 'Ответ 1'])
+        self.assertIsNotNone(data['next'])
+        self.get_json(reverse('api:comments', args=(0,)), status=404)
+
+    def test_large_page_streamed(self):
+        """Страница больше порога отдаётся потоком с теми же курсорами"""
+        Post.objects.bulk_create(
+            Post(text='Ещё пост', author=self.author)
+            for _ in range(STREAM_THRESHOLD + 10))
+        url = reverse('api:posts')
+        limit = STREAM_THRESHOLD + 1
+        response = self.client.get(url, {'limit': limit, 'fields': 'id'})
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data['results']), limit)
+        self.assertIsNone(data['previous'])
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+        rest = self.get_json(url, limit=limit, fields='id',
+                             cursor=data['next'])
+        self.assertEqual(
+            [post['id'] for post in data['results'] + rest['results']],
+            expected)
+        self.assertIsNone(rest['next'])
+        self.assertIsNotNone(rest['previous'])
+
+    def test_new_group_refreshes_etag(self):
+        """Новая группа меняет ETag списка групп"""
+        url = reverse('api:groups')
+        etag = self.client.get(url)['ETag']
+        Group.objects.create(title='Новая', slug='new', description='')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        slugs = [group['slug'] for group in response.json()['results']]
+        self.assertIn('new', slugs)
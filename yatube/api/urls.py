@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.posts_list, name='posts'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post'),
+    path('v1/posts/<int:post_id>/comments/', views.comments_list,
+         name='comments'),
+    path('v1/groups/', views.groups_list, name='groups'),
+    path('v1/groups/<slug:slug>/', views.group_detail, name='group'),
+]
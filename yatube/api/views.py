@@ -0,0 +1,179 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from core.db.router import use_replica
+from core.paginator import CursorPaginator
+from posts.cache import conditional_page, feed_etag, post_etag
+from posts.models import Comment, Group, Post
+from posts.views import COMMENTS_ORDERING, POSTS_AMOUNT
+from .serializers import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, Resource,
+)
+
+POSTS_ORDERING = ('-pub_date', '-pk')
+GROUPS_ORDERING = ('title', 'pk')
+MAX_LIMIT = 1000
+MAX_IDS = 100
+# страницы больше этого отдаются потоком, не собираясь в памяти
+STREAM_THRESHOLD = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view_func):
+    """Переводит ApiError в JSON-ответ с кодом ошибки."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return _wrapped_view
+
+
+def get_resource(request, fields):
+    try:
+        return Resource(fields, request.GET.get('fields'))
+    except ValueError as error:
+        raise ApiError(str(error))
+
+
+def get_limit(request, default=POSTS_AMOUNT):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def get_or_404(queryset, **lookup):
+    obj = queryset.filter(**lookup).first()
+    if obj is None:
+        raise ApiError('Не найдено', status=404)
+    return obj
+
+
+def page_response(request, resource, queryset, ordering):
+    """Страница с курсорами next/previous; большие — потоком."""
+    limit = get_limit(request)
+    paginator = CursorPaginator(
+        resource.prepare(queryset, ordering), limit, ordering=ordering)
+    cursor = request.GET.get('cursor')
+    if limit > STREAM_THRESHOLD:
+        rows = paginator.forward_rows(cursor)
+        if rows is not None:
+            # поток читается после выхода из представления, когда выбор
+            # реплики уже сброшен: база фиксируется сейчас
+            rows = rows.using(rows.db)
+            return StreamingHttpResponse(
+                stream_page(resource, paginator, rows, first=not cursor),
+                content_type='application/json',
+            )
+    page = paginator.get_page(cursor=cursor)
+    return JsonResponse({
+        'results': [resource.serialize(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def stream_page(resource, paginator, rows, first):
+    yield '{"results": ['
+    head = last = None
+    count = 0
+    has_next = False
+    for obj in rows.iterator():
+        if count == paginator.per_page:
+            has_next = True
+            break
+        yield (',' if count else '') + json.dumps(
+            resource.serialize(obj), cls=DjangoJSONEncoder)
+        head = head or obj
+        last = obj
+        count += 1
+    next_cursor = paginator.cursor_after(last) if has_next else None
+    previous_cursor = (
+        paginator.cursor_before(head) if head and not first else None)
+    yield '], "next": %s, "previous": %s}' % (
+        json.dumps(next_cursor), json.dumps(previous_cursor))
+
+
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@api_view
+def posts_list(request):
+    """Лента постов; ?group=, ?author=, ?ids=1,2,3, ?fields=, ?limit=."""
+    resource = get_resource(request, POST_FIELDS)
+    posts = Post.objects.all()
+    ids = request.GET.get('ids')
+    if ids is not None:
+        return posts_bulk(resource, posts, ids)
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    return page_response(request, resource, posts, POSTS_ORDERING)
+
+
+def posts_bulk(resource, posts, ids):
+    try:
+        ids = [int(pk) for pk in ids.split(',') if pk]
+    except ValueError:
+        raise ApiError('ids — список чисел через запятую')
+    if len(ids) > MAX_IDS:
+        raise ApiError(f'Не больше {MAX_IDS} ids за запрос')
+    found = resource.prepare(posts).in_bulk(ids)
+    return JsonResponse({
+        'results': [resource.serialize(found[pk]) for pk in ids
+                    if pk in found],
+    })
+
+
+@use_replica
+@conditional_page(post_etag)
+@api_view
+def post_detail(request, post_id):
+    resource = get_resource(request, POST_FIELDS)
+    post = get_or_404(resource.prepare(Post.objects.all()), pk=post_id)
+    return JsonResponse(resource.serialize(post))
+
+
+@use_replica
+@conditional_page(post_etag)
+@api_view
+def comments_list(request, post_id):
+    """Комментарии поста; ?order=new — сначала новые."""
+    resource = get_resource(request, COMMENT_FIELDS)
+    get_or_404(Post.objects.only('pk'), pk=post_id)
+    order = request.GET.get('order')
+    if order not in COMMENTS_ORDERING:
+        order = 'old'
+    return page_response(
+        request, resource, Comment.objects.filter(post_id=post_id),
+        COMMENTS_ORDERING[order])
+
+
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@api_view
+def groups_list(request):
+    resource = get_resource(request, GROUP_FIELDS)
+    return page_response(
+        request, resource, Group.objects.all(), GROUPS_ORDERING)
+
+
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@api_view
+def group_detail(request, slug):
+    resource = get_resource(request, GROUP_FIELDS)
+    group = get_or_404(resource.prepare(Group.objects.all()), slug=slug)
+    return JsonResponse(resource.serialize(group))
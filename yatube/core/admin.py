@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import Job, StoredFile
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('created', 'claimed_at', 'finished_at')
+
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = (
+        'name',
+        'size',
+        'refs',
+        'created',
+    )
+    readonly_fields = ('name', 'size', 'refs', 'created')
+    search_fields = ('name',)
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(StoredFile, StoredFileAdmin)
@@ -0,0 +1,71 @@
+"Кеш-обёртка, которая считает попадания и промахи для метрик."
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.metrics import record_cache
+
+_missing = object()
+
+
+class InstrumentedCache(BaseCache):
+    """LOCATION — алиас кеша из CACHES, к которому идут все обращения.
+
+    Чтения считаются по видам ключей: OPTIONS['KINDS'] сопоставляет
+    префикс ключа и вид, остальные ключи относятся к виду other.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._alias = location
+        self._kinds = tuple(params.get('OPTIONS', {}).get('KINDS', {}).items())
+
+    @property
+    def backend(self):
+        return caches[self._alias]
+
+    def kind(self, key):
+        for prefix, kind in self._kinds:
+            if key.startswith(prefix):
+                return kind
+        return 'other'
+
+    def get(self, key, default=None, version=None):
+        value = self.backend.get(key, _missing, version)
+        record_cache(self.kind(key), value is not _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        found = self.backend.get_many(keys, version)
+        for key in keys:
+            record_cache(self.kind(key), key in found)
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.add(key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.backend.set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.set_many(data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.backend.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self.backend.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.backend.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.backend.incr(key, delta, version)
+
+    def clear(self):
+        self.backend.clear()
+
+    def close(self, **kwargs):
+        self.backend.close(**kwargs)
@@ -0,0 +1,282 @@
+"""Кеш в Redis (или совместимом сервере) без сторонних клиентов.
+
+Нужен Redis 2.6 или новее: incr выполняется Lua-скриптом через EVAL.
+"""
+import os
+import pickle
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+INTEGER = re.compile(rb'-?\d+')
+# INCRBY только существующего ключа, срок жизни сохраняется
+INCR_SCRIPT = (
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return false end "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1])"
+)
+# повтор после обрыва мог бы применить эти команды дважды
+NOT_RETRIABLE = {'INCRBY', 'EVAL'}
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Соединение по протоколу RESP с конвейерной отправкой команд."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=None):
+        self.timeout = timeout
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def is_alive(self):
+        """Сервер не закрыл соединение, пока оно простаивало."""
+        try:
+            self.sock.setblocking(False)
+            try:
+                self.sock.recv(1, socket.MSG_PEEK)
+            finally:
+                self.sock.settimeout(self.timeout)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        # b'' — соединение закрыто, данные без запроса — рассинхронизация
+        return False
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        self.sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _encode(self, args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Redis закрыл соединение')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            return RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read() for _ in range(length)]
+        raise RedisError(f'Неизвестный ответ сервера: {line!r}')
+
+
+class RedisCache(BaseCache):
+    """LOCATION вида redis://[:password@]host:port/db.
+
+    Целые числа хранятся как есть, чтобы incr выполнялся на сервере
+    командой INCRBY; остальные значения сериализуются pickle.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if '://' not in location:
+            location = f'redis://{location}'
+        url = urlparse(location)
+        self._host = url.hostname or 'localhost'
+        self._port = url.port or 6379
+        self._db = int(url.path.lstrip('/') or 0)
+        self._password = url.password
+        self._socket_timeout = params.get('OPTIONS', {}).get(
+            'SOCKET_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = None
+            local.pid = os.getpid()
+        if local.connection is None:
+            local.connection = RedisConnection(
+                self._host, self._port, self._db, self._password,
+                self._socket_timeout,
+            )
+        return local.connection
+
+    def _pipeline(self, commands):
+        connection = self._connection()
+        if not connection.is_alive():
+            # сервер закрыл простаивавшее соединение, команды ещё не ушли
+            self._drop_connection()
+            connection = self._connection()
+        try:
+            return connection.pipeline(commands)
+        except OSError:
+            # ответа нет, но сервер мог команды выполнить: повторяем,
+            # только если повтор ничего не изменит
+            self._drop_connection()
+            if any(str(args[0]).upper() in NOT_RETRIABLE
+                   for args in commands):
+                raise
+            return self._connection().pipeline(commands)
+
+    def _execute(self, *args):
+        return self._pipeline([args])[0]
+
+    def _drop_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            try:
+                connection.close()
+            except OSError:
+                pass
+        self._local.connection = None
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _loads(self, raw):
+        if INTEGER.fullmatch(raw):
+            return int(raw)
+        return pickle.loads(raw)
+
+    def _ttl(self, timeout):
+        """Срок жизни в миллисекундах; None — бессрочно."""
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return None
+        return int((expires - time.time()) * 1000)
+
+    def _set_command(self, key, value, ttl, *flags):
+        command = ['SET', key, self._dumps(value)]
+        if ttl is not None:
+            command += ['PX', ttl]
+        return command + list(flags)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is not None and ttl <= 0:
+            return False
+        reply = self._execute(*self._set_command(key, value, ttl, 'NX'))
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        raw = self._execute('GET', self._key(key, version))
+        return default if raw is None else self._loads(raw)
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        values = self._execute('MGET', *key_map)
+        return {
+            original: self._loads(raw)
+            for original, raw in zip(key_map.values(), values)
+            if raw is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        keys = [self._key(key, version) for key in data]
+        ttl = self._ttl(timeout)
+        if not keys:
+            return []
+        if ttl is not None and ttl <= 0:
+            self._execute('DEL', *keys)
+            return []
+        self._pipeline([
+            self._set_command(key, value, ttl)
+            for key, value in zip(keys, data.values())
+        ])
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is None:
+            exists, _ = self._pipeline([('EXISTS', key), ('PERSIST', key)])
+            return exists == 1
+        if ttl <= 0:
+            return self._execute('DEL', key) == 1
+        return self._execute('PEXPIRE', key, ttl) == 1
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return self._execute('EXISTS', self._key(key, version)) == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self._execute('EVAL', INCR_SCRIPT, 1, key, delta)
+        except RedisError:
+            # значение не целое: инкремент на стороне клиента с прежним
+            # сроком жизни (PTTL: -1 — бессрочно, -2 — ключа нет)
+            raw, ttl = self._pipeline([('GET', key), ('PTTL', key)])
+            if raw is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._loads(raw) + delta
+            self._execute(*self._set_command(
+                key, value, ttl if ttl > 0 else None, 'XX'))
+            return value
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # соединение живёт дольше запроса: переиспользуем его
+        pass
@@ -0,0 +1,187 @@
+"Общий для всех процессов кеш в отдельном файле SQLite."
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+CULL_EVERY = 100
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле LOCATION; видим всем воркерам на одной машине.
+
+    Файл работает в режиме WAL: чтения не блокируют запись.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # соединение sqlite нельзя переносить через fork
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            local.connection = connection
+            local.pid = os.getpid()
+            local.writes = 0
+        return local.connection
+
+    @contextmanager
+    def _transaction(self, mode='DEFERRED'):
+        connection = self._connection
+        connection.execute(f'BEGIN {mode}')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _write(self, sql, rows):
+        with self._transaction('IMMEDIATE') as connection:
+            connection.executemany(sql, rows)
+        self._local.writes += len(rows)
+        if self._local.writes >= CULL_EVERY:
+            self._local.writes = 0
+            self._cull()
+
+    def _cull(self):
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            count, = connection.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()
+            if count > self._max_entries:
+                excess = count - self._max_entries
+                excess += self._max_entries // self._cull_frequency
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    'SELECT key FROM cache '
+                    'ORDER BY expires IS NULL, expires LIMIT ?)',
+                    (excess,),
+                )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                (key, pickled, self._expires(timeout)),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND ' + ALIVE,
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ', '.join('?' * len(key_map))
+        rows = self._connection.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+            f'AND {ALIVE}',
+            (*key_map, time.time()),
+        )
+        return {key_map[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        self._write(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            [
+                (self._key(key, version),
+                 pickle.dumps(value, self.pickle_protocol),
+                 expires)
+                for key, value in data.items()
+            ],
+        )
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction('IMMEDIATE') as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND '
+                + ALIVE,
+                (self._expires(timeout), key, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        rows = [(self._key(key, version),) for key in keys]
+        with self._transaction('IMMEDIATE') as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', rows)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND ' + ALIVE,
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # IMMEDIATE берёт блокировку записи до чтения значения
+        with self._transaction('IMMEDIATE') as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND ' + ALIVE,
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key),
+            )
+        return value
+
+    def clear(self):
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute('DELETE FROM cache')
@@ -0,0 +1,98 @@
+"Двухуровневый кеш: LRU процесса перед общим кешем."
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class TieredCache(BaseCache):
+    """LOCATION — алиас общего кеша из CACHES.
+
+    Локальный уровень хранит значения не дольше OPTIONS['LOCAL_TIMEOUT']
+    секунд: другой процесс может изменить общий кеш, и рассинхронизация
+    ограничена этим сроком. Записи и удаления идут в оба уровня.
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__(params)
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = LocMemCache(f'tiered:{location}', {
+            'TIMEOUT': self._local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self._local_timeout
+        return min(timeout, self._local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, self._timeout(timeout), version)
+        if added:
+            self._local.set(key, value, self._local_ttl(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = self._local.get(key, missing, version)
+        if value is not missing:
+            return value
+        value = self.shared.get(key, missing, version)
+        if value is missing:
+            return default
+        self._local.set(key, value, self._local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self._local.get_many(keys, version)
+        misses = [key for key in keys if key not in found]
+        if misses:
+            shared = self.shared.get_many(misses, version)
+            self._local.set_many(shared, self._local_timeout, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, self._timeout(timeout), version)
+        self._local.set(key, value, self._local_ttl(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, self._timeout(timeout), version)
+        self._local.set_many(data, self._local_ttl(timeout), version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(key, version)
+        return self.shared.touch(key, self._timeout(timeout), version)
+
+    def delete(self, key, version=None):
+        self._local.delete(key, version)
+        self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self._local.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return (self._local.has_key(key, version)
+                or self.shared.has_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
+
+    def _timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
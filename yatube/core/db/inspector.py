@@ -0,0 +1,141 @@
+"""Поиск N+1 и медленных SQL-запросов в запросах и тестах.
+
+Запросы группируются по форме SQL (литералы и списки IN свёрнуты) и
+месту вызова: строке кода проекта и, если запрос сделал шаблон, строке
+шаблона. Одна и та же форма из одного места N_PLUS_ONE_THRESHOLD раз и
+больше — это N+1, например ленивая загрузка post.author в цикле.
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+Query = namedtuple('Query', 'sql shape site duration')
+
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+CORE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# обёртки выполнения SQL: место вызова ищется за ними
+SKIPPED_PATHS = (
+    os.path.join(CORE_DIR, 'db'),
+    os.path.join(CORE_DIR, 'metrics'),
+)
+
+
+def normalize(sql):
+    """Форма запроса: литералы — ?, списки IN — (...)."""
+    shape = LITERAL.sub('?', sql)
+    shape = PLACEHOLDER_LIST.sub('(...)', shape)
+    return SPACES.sub(' ', shape).strip()
+
+
+def call_site(frame):
+    """Строка кода проекта и строка шаблона, откуда пришёл запрос."""
+    code_site = template_site = None
+    while frame is not None and code_site is None:
+        code = frame.f_code
+        filename = code.co_filename
+        if template_site is None and code.co_name == 'render_annotated':
+            template_site = _template_line(frame.f_locals)
+        if (filename.startswith(settings.BASE_DIR)
+                and not filename.startswith(SKIPPED_PATHS)):
+            code_site = (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return ' ← '.join(filter(None, (template_site, code_site))) or '?'
+
+
+def _template_line(local_vars):
+    node = local_vars.get('self')
+    template = getattr(local_vars.get('context'), 'template', None)
+    token = getattr(node, 'token', None)
+    if template is None or token is None:
+        return None
+    origin = template.origin
+    return f'{origin.template_name or origin.name}:{token.lineno}'
+
+
+class QueryReport:
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+    def record(self, sql, duration, frame):
+        self.queries.append(
+            Query(sql, normalize(sql), call_site(frame), duration))
+
+    def n_plus_one(self, threshold=None):
+        """(форма, место, сколько раз) для повторов SELECT из одного места."""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        repeats = Counter(
+            (query.shape, query.site) for query in self.queries
+            if query.shape.startswith('SELECT')
+        )
+        return [
+            (shape, site, count)
+            for (shape, site), count in repeats.most_common()
+            if count >= threshold
+        ]
+
+    def slow(self, seconds=None):
+        seconds = seconds or settings.SLOW_QUERY_SECONDS
+        return [query for query in self.queries if query.duration >= seconds]
+
+    def problems(self, threshold=None, seconds=None):
+        """Описания найденных проблем, по строке на каждую."""
+        return [
+            f'N+1: {count} раз из {site}: {shape}'
+            for shape, site, count in self.n_plus_one(threshold)
+        ] + [
+            f'Медленный запрос {query.duration * 1000:.0f} мс '
+            f'из {query.site}: {query.sql}'
+            for query in self.slow(seconds)
+        ]
+
+
+@contextmanager
+def inspect_queries():
+    """Записывает SQL всех подключений внутри блока в QueryReport."""
+    report = QueryReport()
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            report.record(
+                sql, time.perf_counter() - started, sys._getframe(1))
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield report
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries=None, threshold=None, seconds=None):
+    """Падает, если в блоке больше max_queries запросов, N+1 или
+    медленные запросы; для тестов представлений."""
+    with inspect_queries() as report:
+        yield report
+    problems = report.problems(threshold, seconds)
+    if max_queries is not None and len(report) > max_queries:
+        problems.insert(0, f'{len(report)} запросов при бюджете {max_queries}')
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(
+            problems + ['Запросы:'] + [
+                f'  {query.site}: {query.sql}' for query in report.queries
+            ]))
@@ -0,0 +1,55 @@
+import logging
+
+from django.conf import settings
+
+from .inspector import inspect_queries
+from .router import begin_request, end_request, read_from_replica
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaMiddleware:
+    """Направляет чтение use_replica-представлений на реплики.
+
+    После запроса, который писал в базу, ставит cookie: следующие
+    REPLICA_STICKY_SECONDS секунд пользователь читает основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        begin_request(sticky=STICKY_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = end_request()
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and getattr(view_func, 'use_replica', False)):
+            read_from_replica()
+
+
+class QueryInspectorMiddleware:
+    """Пишет в лог N+1 и медленные запросы; для разработки и CI."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries() as report:
+            response = self.get_response(request)
+        for problem in report.problems():
+            logger.warning('%s %s: %s', request.method, request.path, problem)
+        return response
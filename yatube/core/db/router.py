@@ -0,0 +1,71 @@
+"""Чтение с реплик для помеченных представлений, запись — в основную базу.
+
+Состояние хранится на поток: ReplicaMiddleware открывает его на время
+запроса, а представление с use_replica переключает чтение на случайную
+реплику из settings.DATABASE_REPLICAS. Вне запросов (команды, фоновые
+потоки) всё читается из основной базы.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def use_replica(view_func):
+    """Помечает представление как только читающее."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        return view_func(request, *args, **kwargs)
+    _wrapped_view.use_replica = True
+    return _wrapped_view
+
+
+def begin_request(sticky):
+    _state.active = True
+    _state.sticky = sticky
+    _state.replica = None
+    _state.wrote = False
+
+
+def end_request():
+    """Закрывает состояние запроса; True, если запрос писал в базу."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.active = False
+    _state.replica = None
+    _state.wrote = False
+    return wrote
+
+
+def read_from_replica():
+    # после записи пользователь читает основную базу, пока реплики
+    # не догнали её: иначе он не увидит собственный пост
+    if _state.sticky or not settings.DATABASE_REPLICAS:
+        return
+    _state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+
+def reading_replica():
+    """Текущий запрос читает реплику, которая может отставать."""
+    return getattr(_state, 'replica', None) is not None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'active', False):
+            _state.wrote = True
+            _state.replica = None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии основной базы
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,212 @@
+"""Фоновые задачи с долговечной очередью в базе данных.
+
+Функция, помеченная @task, ставится в очередь вызовом .delay(): в таблицу
+Job пишутся её имя и аргументы в JSON. Задачи разбирает команда
+run_workers, а если JOBS_INLINE_WORKERS больше нуля — ещё и пул потоков
+веб-процесса сразу после коммита. Очередь переживает перезапуск: задачу
+воркера, который умер, через CLAIM_TIMEOUT берёт другой. Упавшая задача
+повторяется с экспоненциальной задержкой, пока не кончатся попытки;
+результат и последняя ошибка остаются в строке Job.
+"""
+import functools
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(seconds=30)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# сколько кандидатов перебирать, если соседний воркер успел раньше
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Task:
+    """Обёртка функции: вызов выполняет её сразу, delay() — в воркере."""
+
+    def __init__(self, func, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def job(self, *args, **kwargs):
+        return Job(
+            name=self.name,
+            payload=json.dumps(
+                {'args': args, 'kwargs': kwargs}, cls=DjangoJSONEncoder),
+            max_attempts=self.max_attempts,
+        )
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь; возвращает строку Job."""
+        job = self.job(*args, **kwargs)
+        job.save()
+        _wake_inline_workers()
+        return job
+
+    def delay_many(self, calls):
+        """Ставит пачку вызовов одним INSERT; calls — кортежи аргументов."""
+        jobs = Job.objects.bulk_create(self.job(*args) for args in calls)
+        _wake_inline_workers()
+        return jobs
+
+
+def task(func=None, *, max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+    """Декоратор фоновой задачи: @task или @task(max_attempts=5).
+
+    Аргументы и результат задачи должны сериализоваться в JSON.
+    """
+    def register(func):
+        wrapped = Task(func, max_attempts, retry_delay)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+    return register if func is None else register(func)
+
+
+def get_task(name):
+    if name not in _registry:
+        # воркер мог ещё не импортировать модуль задачи
+        import_string(name)
+    return _registry[name]
+
+
+def claim_job(names=None):
+    """Берёт задачу, срок которой подошёл, или брошенную воркером."""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, claimed_at__lt=now - CLAIM_TIMEOUT)
+    ).order_by('run_at', 'pk')
+    if names is not None:
+        candidates = candidates.filter(name__in=names)
+    for job in candidates[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, claimed_at=job.claimed_at,
+        ).update(
+            status=Job.RUNNING, claimed_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            job.status, job.claimed_at = Job.RUNNING, now
+            job.attempts += 1
+            return job
+    return None
+
+
+def run_job(job):
+    """Выполняет взятую задачу и записывает итог; True — успешно."""
+    if job.attempts > job.max_attempts:
+        # попытки кончились на воркере, который не дожил до итога
+        _save_outcome(job, status=Job.FAILED,
+                      error='Воркер не завершил последнюю попытку')
+        return False
+    retry_delay = RETRY_DELAY
+    try:
+        wrapped = get_task(job.name)
+        retry_delay = wrapped.retry_delay
+        payload = json.loads(job.payload)
+        result = json.dumps(
+            wrapped(*payload['args'], **payload['kwargs']),
+            cls=DjangoJSONEncoder)
+    except Exception:
+        logger.exception('Задача %s упала на попытке %s',
+                         job, job.attempts)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            _save_outcome(
+                job, status=Job.QUEUED, claimed_at=None, error=error,
+                run_at=timezone.now()
+                + retry_delay * 2 ** (job.attempts - 1))
+        else:
+            _save_outcome(job, status=Job.FAILED, error=error)
+        return False
+    _save_outcome(job, status=Job.DONE, result=result)
+    return True
+
+
+def work(stop=None, burst=False, poll_interval=1.0, limit=None,
+         names=None):
+    """Цикл воркера; возвращает число выполненных задач.
+
+    burst — выйти, как только очередь опустеет; stop — событие, по
+    которому воркер выходит после текущей задачи.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        if stop is not None and stop.is_set():
+            break
+        job = claim_job(names)
+        if job is None:
+            if burst or stop is None:
+                break
+            stop.wait(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def process_jobs(limit=None, names=None):
+    """Разбирает очередь до конца в текущем потоке."""
+    return work(burst=True, limit=limit, names=names)
+
+
+def purge_finished(older_than):
+    """Удаляет выполненные задачи, завершённые раньше older_than назад."""
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
+
+
+def _save_outcome(job, **fields):
+    if fields['status'] in (Job.DONE, Job.FAILED):
+        fields['finished_at'] = timezone.now()
+    # пока задача шла, её мог перехватить воркер после CLAIM_TIMEOUT
+    Job.objects.filter(pk=job.pk, claimed_at=job.claimed_at).update(**fields)
+
+
+def _wake_inline_workers():
+    if settings.JOBS_INLINE_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_drain))
+
+
+def _drain():
+    try:
+        process_jobs()
+    except Exception:
+        logger.exception('Встроенный воркер упал')
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOBS_INLINE_WORKERS,
+                thread_name_prefix='jobs',
+            )
+    return _executor
@@ -0,0 +1,112 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import StoredFile
+from core.storage import media_storage, tracked_fields
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает ссылки на медиафайлы и удаляет файлы, на '
+            'которые ничто не ссылается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Не трогать файлы моложе этого: их пост ещё сохраняется.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено.',
+        )
+
+    def handle(self, *args, grace_hours, dry_run, **options):
+        cutoff = timezone.now() - timedelta(hours=grace_hours)
+        fields = tracked_fields(apps.get_models())
+        # счётчики ведут сигналы, но bulk-операции их обходят: перед
+        # удалением считаем ссылки заново
+        refs = self.count_references(fields)
+        stored = self.sync_refs(refs)
+        unreferenced = list(StoredFile.objects.filter(
+            refs__lte=0, created__lt=cutoff,
+        ).values_list('name', flat=True))
+        orphans = [
+            name for name in self.files_on_disk(fields)
+            if name not in stored
+            and media_storage.get_modified_time(name) < cutoff
+        ]
+        freed = removed = 0
+        for name in unreferenced + orphans:
+            size = (media_storage.size(name)
+                    if media_storage.exists(name) else 0)
+            if not dry_run and not self.delete(name, cutoff):
+                # файл снова загрузили, пока шла сборка
+                continue
+            freed += size
+            removed += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(name)
+        if options['verbosity']:
+            verb = 'Будет удалено' if dry_run else 'Удалено'
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} файлов: {removed}, '
+                f'{freed / 2 ** 20:.1f} МБ'))
+
+    def delete(self, name, cutoff):
+        """Удаляет файл, если он всё ещё не нужен; True — удалён."""
+        with transaction.atomic():
+            # удаление строки блокирует её до коммита: загрузка того же
+            # содержимого ждёт и после нас запишет файл заново
+            deleted, _ = StoredFile.objects.filter(
+                name=name, refs__lte=0, created__lt=cutoff).delete()
+            if not deleted:
+                if StoredFile.objects.filter(name=name).exists():
+                    return False
+                if (media_storage.exists(name)
+                        and media_storage.get_modified_time(name) >= cutoff):
+                    return False
+            media_storage.delete(name)
+        return True
+
+    def count_references(self, fields):
+        refs = Counter()
+        for model, field in fields:
+            rows = (
+                model._base_manager.exclude(**{field.name: ''})
+                .values_list(field.name).annotate(refs=Count('pk'))
+                .order_by()
+            )
+            for name, count in rows.iterator():
+                refs[name] += count
+        return refs
+
+    def sync_refs(self, refs):
+        """Записывает счётчики; возвращает имена всех известных файлов."""
+        stored = dict(StoredFile.objects.values_list('name', 'refs'))
+        for name, count in stored.items():
+            if refs.get(name, 0) != count:
+                StoredFile.objects.filter(name=name).update(
+                    refs=refs.get(name, 0))
+        StoredFile.objects.bulk_create(
+            (StoredFile(name=name, refs=count)
+             for name, count in refs.items() if name not in stored),
+            ignore_conflicts=True,
+        )
+        return stored.keys() | refs.keys()
+
+    def files_on_disk(self, fields):
+        roots = {
+            str(field.upload_to).strip('/').split('/')[0]
+            for _, field in fields if not callable(field.upload_to)
+        }
+        for root in roots:
+            for directory, _, files in os.walk(media_storage.path(root)):
+                relative = os.path.relpath(directory, media_storage.location)
+                for file in files:
+                    yield os.path.join(relative, file).replace(os.sep, '/')
@@ -0,0 +1,78 @@
+import multiprocessing
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import purge_finished, work
+
+
+class Command(BaseCommand):
+    help = ('Запускает воркеры фоновых задач. SIGTERM или Ctrl+C '
+            'останавливают их после текущей задачи.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Число процессов-воркеров; 1 — в текущем процессе.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах между проверками пустой очереди.',
+        )
+
+    def handle(self, *args, concurrency, burst, poll_interval, **options):
+        purged = purge_finished(timedelta(days=settings.JOB_RESULT_DAYS))
+        worker_options = {'burst': burst, 'poll_interval': poll_interval}
+        if concurrency <= 1:
+            stop = threading.Event()
+            _stop_on_signals(stop)
+            processed = work(stop=stop, **worker_options)
+        else:
+            processed = self.run_processes(concurrency, worker_options)
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Выполнено задач: {processed}, '
+                f'удалено старых результатов: {purged}'))
+
+    def run_processes(self, concurrency, worker_options):
+        # fork наследует настроенный Django; открытые подключения к базе
+        # закрываем, чтобы процессы не делили один сокет
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        processed = context.Value('i', 0)
+        processes = [
+            context.Process(
+                target=_run_process, args=(stop, processed, worker_options),
+                name=f'jobs-worker-{number}',
+            )
+            for number in range(concurrency)
+        ]
+        for process in processes:
+            process.start()
+        _stop_on_signals(stop)
+        for process in processes:
+            process.join()
+        return processed.value
+
+
+def _run_process(stop, processed, worker_options):
+    _stop_on_signals(stop)
+    count = work(stop=stop, **worker_options)
+    with processed.get_lock():
+        processed.value += count
+
+
+def _stop_on_signals(stop):
+    def handler(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
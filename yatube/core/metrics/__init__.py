@@ -0,0 +1,240 @@
+"""Метрики производительности, собираемые в памяти процесса.
+
+Счётчики и гистограммы живут в процессе; /metrics отдаёт их в
+текстовом формате Prometheus, а складывает по процессам сам Prometheus.
+Пока идёт запрос, MetricsMiddleware копит его показатели в
+RequestStats текущего потока — из них строится Server-Timing.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_registry = {}
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _labels(self, key, **extra):
+        return {**dict(zip(self.labels, key)), **extra}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, self._labels(key), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       self._labels(key, le=bound), cumulative)
+            yield f'{self.name}_sum', self._labels(key), total
+            yield f'{self.name}_count', self._labels(key), cumulative
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = cls(name, *args, **kwargs)
+        return _registry[name]
+
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DURATION_BUCKETS):
+    return _register(Histogram, name, help, labels, buckets)
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{_format_labels(labels)} {value!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+REQUEST_SECONDS = histogram(
+    'yatube_request_duration_seconds', 'Время ответа на запрос.',
+    ('view', 'method', 'status'))
+DB_QUERIES = histogram(
+    'yatube_request_db_queries', 'Число SQL-запросов за запрос.',
+    ('view',), COUNT_BUCKETS)
+DB_SECONDS = histogram(
+    'yatube_request_db_duration_seconds', 'Время SQL-запросов за запрос.',
+    ('view',))
+TEMPLATE_SECONDS = histogram(
+    'yatube_request_template_duration_seconds',
+    'Время рендера шаблонов за запрос.', ('view',))
+CACHE_REQUESTS = counter(
+    'yatube_cache_requests_total', 'Чтения кеша по видам ключей.',
+    ('kind', 'result'))
+
+
+class RequestStats:
+    """Показатели одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # прочие отрезки времени для Server-Timing: имя → секунды
+        self.spans = {}
+        self.rendering = False
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        entries = [
+            f'app;dur={self.elapsed * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hit {self.cache_misses} miss"',
+        ]
+        entries += [
+            f'{name};dur={seconds * 1000:.1f}'
+            for name, seconds in self.spans.items()
+        ]
+        return ', '.join(entries)
+
+
+def begin_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def end_request():
+    stats = current()
+    _local.stats = None
+    return stats
+
+
+def current():
+    """RequestStats текущего запроса или None вне запроса."""
+    return getattr(_local, 'stats', None)
+
+
+def query_timer(execute, sql, params, many, context):
+    """execute_wrapper: считает SQL-запросы текущего запроса."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = current()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - started
+
+
+def record_cache(kind, hit):
+    CACHE_REQUESTS.inc(kind=kind, result='hit' if hit else 'miss')
+    stats = current()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+@contextmanager
+def template_timer():
+    """Время рендера шаблона; вложенные рендеры входят во внешний."""
+    stats = current()
+    if stats is None or stats.rendering:
+        yield
+        return
+    stats.rendering = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.rendering = False
+        stats.template_time += time.perf_counter() - started
+
+
+@contextmanager
+def timer(metric, span=None, **labels):
+    """Пишет длительность блока в гистограмму и в Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metric.observe(elapsed, **labels)
+        stats = current()
+        if span is not None and stats is not None:
+            stats.spans[span] = stats.spans.get(span, 0) + elapsed
@@ -0,0 +1,63 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import (
+    DB_QUERIES, DB_SECONDS, REQUEST_SECONDS, TEMPLATE_SECONDS,
+    begin_request, end_request, query_timer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Замеряет запрос: время, SQL, шаблоны, кеш.
+
+    Итог уходит в гистограммы процесса, в заголовок Server-Timing и
+    строкой JSON в лог: медленные запросы — WARNING, остальные — INFO.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = begin_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(query_timer))
+                response = self.get_response(request)
+        finally:
+            end_request()
+        elapsed = stats.elapsed
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+
+        REQUEST_SECONDS.observe(
+            elapsed, view=view, method=request.method,
+            status=response.status_code)
+        DB_QUERIES.observe(stats.db_queries, view=view)
+        DB_SECONDS.observe(stats.db_time, view=view)
+        TEMPLATE_SECONDS.observe(stats.template_time, view=view)
+        response['Server-Timing'] = stats.server_timing()
+
+        slow = elapsed >= settings.SLOW_REQUEST_SECONDS
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'db_queries': stats.db_queries,
+            'db_ms': round(stats.db_time * 1000, 1),
+            'template_ms': round(stats.template_time * 1000, 1),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+            **{f'{name}_ms': round(seconds * 1000, 1)
+               for name, seconds in stats.spans.items()},
+        }, ensure_ascii=False))
+        return response
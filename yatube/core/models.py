@@ -0,0 +1,126 @@
+import json
+
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name="Задача",
+        help_text="Полное имя функции, помеченной @task",
+    )
+    payload = models.TextField(
+        verbose_name="Аргументы",
+        help_text="JSON с args и kwargs",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name="Состояние",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попытки",
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Предел попыток",
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Выполнить не раньше",
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Взята в работу",
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки",
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Дата завершения",
+    )
+    result = models.TextField(
+        blank=True,
+        verbose_name="Результат",
+        help_text="JSON с возвращённым значением",
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Последняя ошибка",
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        # выборка воркера: status = queued AND run_at <= now
+        indexes = (
+            models.Index(fields=('status', 'run_at'), name='job_due_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    @property
+    def result_value(self):
+        """Значение, которое вернула задача, или None."""
+        return json.loads(self.result) if self.result else None
+
+
+class StoredFileQuerySet(models.QuerySet):
+    def add_reference(self, name, delta):
+        """Меняет число ссылок на файл; строку создаёт при первой ссылке."""
+        if not name:
+            return
+        updated = self.filter(name=name).update(refs=F('refs') + delta)
+        if not updated and delta > 0:
+            self.get_or_create(name=name, defaults={'refs': delta})
+
+
+class StoredFile(models.Model):
+    """Файл хранилища ContentAddressedStorage и число ссылок на него."""
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="Путь",
+    )
+    size = models.BigIntegerField(
+        default=0,
+        verbose_name="Размер, байт",
+    )
+    refs = models.IntegerField(
+        default=0,
+        verbose_name="Ссылок",
+        help_text="Сколько строк ссылается на файл",
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата загрузки",
+    )
+
+    objects = StoredFileQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
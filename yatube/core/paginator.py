@@ -0,0 +1,264 @@
+import base64
+import binascii
+import heapq
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+LAST = 'last'
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: вместо номера хранит курсоры соседей."""
+
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s items>' % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def last_cursor(self):
+        return self.paginator.last_cursor
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу сортировки без COUNT(*) и OFFSET.
+
+    Все поля ordering должны сортироваться в одном направлении,
+    последнее поле должно быть уникальным (обычно pk).
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        directions = {field.startswith('-') for field in ordering}
+        if len(directions) != 1:
+            raise ValueError('Поля ordering должны иметь одно направление.')
+        self.ordering = tuple(ordering)
+        self.descending = directions.pop()
+        self.fields = [field.lstrip('-') for field in ordering]
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @property
+    def last_cursor(self):
+        return self._encode(LAST, [])
+
+    def clean_cursor(self, cursor):
+        """Курсор в каноническом виде; '' — испорченный, первая страница.
+
+        Годится в ключ кеша: мусор из адреса не плодит записей.
+        """
+        position = self._decode(cursor)
+        if position is None:
+            return ''
+        direction, values = position
+        return self._encode(direction, [str(value) for value in values])
+
+    def get_page(self, number=None, cursor=None):
+        """Страница по курсору, по старому номеру ?page=N или первая."""
+        position = self._decode(cursor)
+        if position is not None:
+            direction, values = position
+            if direction == LAST:
+                return self._last_page()
+            if direction == PREVIOUS:
+                return self._page_before(values)
+            return self._page_after(values)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number > 1:
+            return self._offset_page(number)
+        return self._first_page()
+
+    def forward_rows(self, cursor=None):
+        """Выборка страницы вперёд из per_page + 1 строк без выполнения.
+
+        Нужна для потоковой отдачи больших страниц; для курсоров назад
+        и на последнюю страницу возвращает None — их читают get_page.
+        """
+        position = self._decode(cursor)
+        if position is None:
+            return self.object_list[:self.per_page + 1]
+        direction, values = position
+        if direction != NEXT:
+            return None
+        return self.object_list.filter(
+            self._keyset(values, forward=True))[:self.per_page + 1]
+
+    def cursor_after(self, obj):
+        return self._cursor(NEXT, obj)
+
+    def cursor_before(self, obj):
+        return self._cursor(PREVIOUS, obj)
+
+    def _first_page(self):
+        rows = list(self.object_list[:self.per_page + 1])
+        return self._forward_page(rows, 1, has_previous=False)
+
+    def _page_after(self, values):
+        rows = list(
+            self.object_list.filter(self._keyset(values, forward=True))
+            [:self.per_page + 1]
+        )
+        if not rows:
+            return self._last_page()
+        return self._forward_page(rows, None, has_previous=True)
+
+    def _offset_page(self, number):
+        offset = (number - 1) * self.per_page
+        rows = list(self.object_list[offset:offset + self.per_page + 1])
+        if not rows:
+            return self._last_page()
+        return self._forward_page(rows, number, has_previous=True)
+
+    def _page_before(self, values):
+        rows = list(
+            self._reversed().filter(self._keyset(values, forward=False))
+            [:self.per_page + 1]
+        )
+        if not rows:
+            return self._first_page()
+        return self._backward_page(rows, has_next=True)
+
+    def _last_page(self):
+        rows = list(self._reversed()[:self.per_page + 1])
+        return self._backward_page(rows, has_next=False)
+
+    def _forward_page(self, rows, number, has_previous):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, number, self,
+            next_cursor=self._cursor(NEXT, rows[-1]) if has_next else None,
+            previous_cursor=(
+                self._cursor(PREVIOUS, rows[0])
+                if has_previous and rows else None
+            ),
+        )
+
+    def _backward_page(self, rows, has_next):
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(
+            rows, None, self,
+            next_cursor=(
+                self._cursor(NEXT, rows[-1]) if has_next and rows else None
+            ),
+            previous_cursor=(
+                self._cursor(PREVIOUS, rows[0]) if has_previous else None
+            ),
+        )
+
+    def _reversed(self):
+        return self.object_list.reverse()
+
+    def _keyset(self, values, forward):
+        lookup = 'lt' if self.descending == forward else 'gt'
+        query = Q()
+        for index, field in enumerate(self.fields):
+            condition = Q(**{f'{field}__{lookup}': values[index]})
+            for equal_field, value in zip(self.fields, values[:index]):
+                condition &= Q(**{equal_field: value})
+            query |= condition
+        # избыточная граница по первому полю даёт планировщику диапазон
+        # индекса; без неё OR заставляет сортировать выборку заново
+        bound = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+        return bound & query
+
+    def _model_field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _cursor(self, direction, obj):
+        return self._encode(direction, [
+            self._model_field(name).value_to_string(obj)
+            for name in self.fields
+        ])
+
+    def _encode(self, direction, values):
+        raw = json.dumps([direction, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw.decode())
+            if direction == LAST:
+                return direction, []
+            if direction not in (NEXT, PREVIOUS):
+                return None
+            if len(values) != len(self.fields):
+                return None
+            return direction, [
+                self._model_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValidationError, ValueError, TypeError):
+            return None
+
+
+class MergedQuerySet:
+    """Несколько выборок одной модели как одна упорядоченная.
+
+    Поддерживает ровно то, что нужно CursorPaginator: order_by, filter,
+    reverse и срезы. Срез [a:b] читает по b строк из каждой выборки и
+    сливает их по полям сортировки, дубликаты по pk отбрасываются.
+    """
+
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.model = querysets[0].model
+        self.ordering = tuple(ordering)
+
+    def order_by(self, *fields):
+        return MergedQuerySet(
+            *(qs.order_by(*fields) for qs in self.querysets),
+            ordering=fields)
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(
+            *(qs.filter(*args, **kwargs) for qs in self.querysets),
+            ordering=self.ordering)
+
+    def reverse(self):
+        return MergedQuerySet(
+            *(qs.reverse() for qs in self.querysets),
+            ordering=[
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ])
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.stop is None:
+            raise TypeError('MergedQuerySet поддерживает только срезы')
+        fields = [field.lstrip('-') for field in self.ordering]
+        descending = bool(self.ordering) and self.ordering[0].startswith('-')
+        merged = heapq.merge(
+            *(list(qs[:item.stop]) for qs in self.querysets),
+            key=lambda obj: [getattr(obj, field) for field in fields],
+            reverse=descending,
+        )
+        seen = set()
+        rows = []
+        for obj in merged:
+            if obj.pk not in seen:
+                seen.add(obj.pk)
+                rows.append(obj)
+        return rows[item]
@@ -0,0 +1,11 @@
+"""Отдача статики и медиа без Django.
+
+collectstatic с CompressedManifestStorage даёт файлам имена с хешем
+содержимого и кладёт рядом сжатые .gz (и .br, если установлен brotli).
+FileServer в yatube/wsgi.py отдаёт их сам: со сжатой версией по
+Accept-Encoding, диапазонами Range, file_wrapper сервера для отдачи без
+копирования и бессрочным кешем для файлов, чьё имя меняется вместе с
+содержимым.
+"""
+# год — предел, который понимают все кеши
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
@@ -0,0 +1,50 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico',
+)
+# сжатая версия нужна, только если она заметно меньше
+MIN_SAVING = 0.05
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени и заранее сжатыми копиями."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            packed = compress(data)
+            if len(packed) > len(data) * (1 - MIN_SAVING):
+                continue
+            with open(path + suffix, 'wb') as target:
+                target.write(packed)
+            # Last-Modified сжатой копии совпадает с оригиналом
+            stat = os.stat(path)
+            os.utime(path + suffix, (stat.st_atime, stat.st_mtime))
+            yield name + suffix
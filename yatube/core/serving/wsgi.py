@@ -0,0 +1,220 @@
+import mimetypes
+import os
+import re
+import stat
+from collections import namedtuple
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+
+from django.conf import settings
+
+from core.storage import is_hashed, is_private
+
+from . import IMMUTABLE_CACHE_CONTROL
+
+# имя от ManifestStaticFilesStorage: logo.0123456789ab.png
+MANIFEST_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+BLOCK_SIZE = 64 * 1024
+
+Root = namedtuple('Root', 'prefix directory is_immutable is_private')
+Found = namedtuple('Found', 'path size mtime encoding')
+
+
+def static_name_is_immutable(name):
+    return bool(MANIFEST_NAME.search(name))
+
+
+class FileServer:
+    """WSGI-обёртка: отдаёт файлы из roots, остальное — приложению."""
+
+    def __init__(self, application, roots):
+        """roots — (префикс URL, каталог, is_immutable[, is_private])."""
+        self.application = application
+        self.roots = [
+            Root(prefix, os.path.realpath(directory), is_immutable,
+                 rest[0] if rest else _never)
+            for prefix, directory, is_immutable, *rest in roots
+            if prefix and directory
+        ]
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            path = environ.get('PATH_INFO', '')
+            for root in self.roots:
+                if path.startswith(root.prefix):
+                    name = path[len(root.prefix):]
+                    response = self.serve(environ, root, name)
+                    if response is not None:
+                        return response(start_response)
+        return self.application(environ, start_response)
+
+    def serve(self, environ, root, name):
+        """Ответ на запрос файла или None, если такого файла нет."""
+        path = os.path.realpath(os.path.join(root.directory, name))
+        if not path.startswith(root.directory + os.sep):
+            return None
+        # проверяем нормализованное имя: posts/./incoming/ — тоже закрыто
+        if root.is_private(os.path.relpath(path, root.directory).replace(
+                os.sep, '/')):
+            return None
+        ranged = 'HTTP_RANGE' in environ
+        found = self.find(path, '' if ranged else environ.get(
+            'HTTP_ACCEPT_ENCODING', ''))
+        if found is None:
+            return None
+        etag = f'"{found.size:x}-{int(found.mtime):x}"'
+        headers = [
+            ('Content-Type', _content_type(path)),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL
+             if root.is_immutable(name) else DEFAULT_CACHE_CONTROL),
+            ('ETag', etag),
+            ('Last-Modified', formatdate(found.mtime, usegmt=True)),
+            ('Accept-Ranges', 'bytes'),
+        ]
+        if any(os.path.exists(path + suffix) for _, suffix in ENCODINGS):
+            headers.append(('Vary', 'Accept-Encoding'))
+        if found.encoding:
+            headers.append(('Content-Encoding', found.encoding))
+        if _not_modified(environ, etag, found.mtime):
+            return Response(HTTPStatus.NOT_MODIFIED, headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            headers.append(('Content-Length', str(found.size)))
+            return Response(HTTPStatus.OK, headers)
+        if ranged and environ.get('HTTP_IF_RANGE', etag) == etag:
+            return self.serve_range(environ, found, headers)
+        headers.append(('Content-Length', str(found.size)))
+        return Response(HTTPStatus.OK, headers, found.path, environ)
+
+    def serve_range(self, environ, found, headers):
+        byte_range = _parse_range(environ['HTTP_RANGE'], found.size)
+        if byte_range is None:
+            # несколько диапазонов не поддерживаем: отдаём файл целиком
+            headers.append(('Content-Length', str(found.size)))
+            return Response(HTTPStatus.OK, headers, found.path, environ)
+        if byte_range is False:
+            headers.append(('Content-Range', f'bytes */{found.size}'))
+            return Response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                            headers)
+        start, end = byte_range
+        headers.append(('Content-Range', f'bytes {start}-{end}/{found.size}'))
+        headers.append(('Content-Length', str(end - start + 1)))
+        return Response(HTTPStatus.PARTIAL_CONTENT, headers, found.path,
+                        environ, start, end - start + 1)
+
+    def find(self, path, accept_encoding):
+        """Файл или его сжатая копия, которую примет клиент."""
+        accepted = {
+            part.split(';')[0].strip() for part in accept_encoding.split(',')
+        }
+        candidates = [
+            (path + suffix, encoding)
+            for encoding, suffix in ENCODINGS if encoding in accepted
+        ] + [(path, None)]
+        for candidate, encoding in candidates:
+            try:
+                info = os.stat(candidate)
+            except OSError:
+                continue
+            if stat.S_ISREG(info.st_mode):
+                return Found(candidate, info.st_size, info.st_mtime, encoding)
+        return None
+
+
+class Response:
+    def __init__(self, status, headers, path=None, environ=None, offset=0,
+                 length=None):
+        self.status = f'{status.value} {status.phrase}'
+        self.headers = headers
+        self.path = path
+        self.environ = environ
+        self.offset = offset
+        self.length = length
+
+    def __call__(self, start_response):
+        start_response(self.status, self.headers)
+        if self.path is None:
+            return []
+        file = open(self.path, 'rb')
+        if self.length is None:
+            # сервер (gunicorn, uWSGI) отдаст файл через sendfile
+            file_wrapper = self.environ.get('wsgi.file_wrapper')
+            if file_wrapper is not None:
+                return file_wrapper(file, BLOCK_SIZE)
+            return _read(file, None)
+        file.seek(self.offset)
+        return _read(file, self.length)
+
+
+def _read(file, length):
+    with file:
+        while length is None or length > 0:
+            block = file.read(
+                BLOCK_SIZE if length is None else min(BLOCK_SIZE, length))
+            if not block:
+                return
+            if length is not None:
+                length -= len(block)
+            yield block
+
+
+def _never(name):
+    return False
+
+
+def _content_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    if content_type is None or encoding is not None:
+        # x.css.gz, запрошенный по своему имени, — просто архив
+        return 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in (
+            'application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _not_modified(environ, etag, mtime):
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(','))
+    if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since
+
+
+def _parse_range(header, size):
+    """(начало, конец) включительно; None — разбирать не будем,
+    False — диапазон за пределами файла."""
+    match = RANGE.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-500: последние 500 байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def project_file_server(application):
+    """FileServer со статикой STATIC_ROOT и медиа MEDIA_ROOT проекта."""
+    return FileServer(application, [
+        (settings.STATIC_URL, settings.STATIC_ROOT,
+         static_name_is_immutable),
+        (settings.MEDIA_URL, settings.MEDIA_ROOT, is_hashed, is_private),
+    ])
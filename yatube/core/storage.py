@@ -0,0 +1,95 @@
+"""Хранилище медиафайлов с адресацией по содержимому.
+
+Файл хранится под SHA-256 своего содержимого, разложенным по каталогам
+ab/cd/abcd….jpg внутри каталога upload_to: ни в одном каталоге не
+скапливаются миллионы файлов, а одинаковые загрузки лежат одним файлом.
+Содержимое по имени не меняется, поэтому такие файлы отдаются с
+бессрочным кешированием. StoredFile.refs — сколько строк ссылается на
+файл; файлы без ссылок удаляет команда collect_media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import FileField
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+HASHED_NAME = re.compile(
+    r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.\w+)?$')
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_hashed(name):
+    """Имя выдано ContentAddressedStorage, содержимое неизменно."""
+    return bool(HASHED_NAME.search(name))
+
+
+def is_private(name):
+    """Файл из MEDIA_PRIVATE_PREFIXES: наружу не отдаётся."""
+    return name.startswith(tuple(settings.MEDIA_PRIVATE_PREFIXES))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # настоящее имя выбирает _save по содержимому
+        return name
+
+    def _save(self, name, content):
+        digest = content_hash(content)
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension)
+        # строку заводим или освежаем до проверки файла: collect_media
+        # удаляет только старые строки без ссылок и держит блокировку
+        # строки, пока удаляет файл, так что он не пропадёт из-под нас
+        stored, created = StoredFile.objects.get_or_create(
+            name=name, defaults={'size': content.size})
+        if not created:
+            StoredFile.objects.filter(pk=stored.pk).update(
+                created=timezone.now())
+        if self.exists(name):
+            # файл без строки collect_media удаляет по времени изменения
+            os.utime(self.path(name))
+        else:
+            # пишем во временный файл и переименовываем: параллельная
+            # загрузка того же содержимого просто заменит файл таким же
+            temporary = super()._save(
+                f'{name}.{uuid.uuid4().hex}.part', content)
+            os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        StoredFile.objects.filter(name=name).delete()
+
+
+media_storage = ContentAddressedStorage()
+
+
+def tracked_fields(models):
+    """(модель, поле) всех файловых полей на ContentAddressedStorage."""
+    return [
+        (model, field)
+        for model in models
+        for field in model._meta.concrete_fields
+        if isinstance(field, FileField)
+        and isinstance(field.storage, ContentAddressedStorage)
+    ]
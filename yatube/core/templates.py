@@ -0,0 +1,44 @@
+"""Прогрев кеша разобранных шаблонов при старте воркера.
+
+С cached.Loader шаблон разбирается один раз на процесс, но первый
+запрос к каждой странице всё равно платит за разбор. warm_up() разбирает
+все шаблоны проекта заранее и падает на синтаксической ошибке до того,
+как воркер начнёт принимать запросы.
+"""
+import os
+
+from django.conf import settings
+from django.template import engines
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def template_dirs(engine):
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, 'loaders', (loader,)):
+            yield from inner.get_dirs()
+
+
+def project_template_names(engine):
+    """Имена шаблонов из каталогов проекта, без шаблонов библиотек."""
+    names = set()
+    for directory in template_dirs(engine):
+        directory = str(directory)
+        if not directory.startswith(settings.BASE_DIR):
+            continue
+        for root, _, files in os.walk(directory):
+            names.update(
+                os.path.relpath(os.path.join(root, file), directory)
+                .replace(os.sep, '/')
+                for file in files if file.endswith(TEMPLATE_EXTENSIONS)
+            )
+    return sorted(names)
+
+
+def warm_up(using='django'):
+    """Разбирает шаблоны проекта в кеш загрузчика; возвращает их число."""
+    engine = engines[using].engine
+    names = project_template_names(engine)
+    for name in names:
+        engine.get_template(name)
+    return len(names)
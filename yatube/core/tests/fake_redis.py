@@ -0,0 +1,170 @@
+"""Минимальный сервер с протоколом Redis для тестов кеша."""
+import socketserver
+import threading
+import time
+
+from core.cache.redis import INCR_SCRIPT
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = self.read_command()
+            except ConnectionError:
+                return
+            if command is None:
+                return
+            name, args = command[0].upper().decode(), command[1:]
+            with self.server.lock:
+                handler = getattr(self, f'do_{name.lower()}', None)
+                if handler is None:
+                    reply = Error(f'ERR unknown command {name}')
+                else:
+                    reply = handler(*args)
+            self.wfile.write(encode(reply))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    @property
+    def data(self):
+        return self.server.data
+
+    def alive(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def do_ping(self):
+        return Status('PONG')
+
+    def do_select(self, db):
+        return Status('OK')
+
+    def do_get(self, key):
+        return self.alive(key)
+
+    def do_mget(self, *keys):
+        return [self.alive(key) for key in keys]
+
+    def do_set(self, key, value, *flags):
+        flags = [flag.upper() for flag in flags]
+        exists = self.alive(key) is not None
+        if b'NX' in flags and exists:
+            return None
+        if b'XX' in flags and not exists:
+            return None
+        expires = None
+        if b'PX' in flags:
+            milliseconds = int(flags[flags.index(b'PX') + 1])
+            expires = time.time() + milliseconds / 1000
+        if b'EX' in flags:
+            expires = time.time() + int(flags[flags.index(b'EX') + 1])
+        self.data[key] = (value, expires)
+        return Status('OK')
+
+    def do_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def do_exists(self, *keys):
+        return sum(self.alive(key) is not None for key in keys)
+
+    def do_incrby(self, key, delta):
+        value = self.alive(key)
+        try:
+            value = int(value or 0) + int(delta)
+        except ValueError:
+            return Error('ERR value is not an integer or out of range')
+        expires = self.data.get(key, (None, None))[1]
+        self.data[key] = (str(value).encode(), expires)
+        return value
+
+    def do_eval(self, script, numkeys, *args):
+        # настоящий Lua не нужен: сервер знает единственный скрипт кеша
+        if script.decode() != INCR_SCRIPT:
+            return Error('ERR unknown script')
+        key, delta = args
+        if self.alive(key) is None:
+            return None
+        return self.do_incrby(key, delta)
+
+    def do_pttl(self, key):
+        if self.alive(key) is None:
+            return -2
+        expires = self.data[key][1]
+        if expires is None:
+            return -1
+        return int((expires - time.time()) * 1000)
+
+    def do_pexpire(self, key, milliseconds):
+        if self.alive(key) is None:
+            return 0
+        self.data[key] = (self.data[key][0],
+                          time.time() + int(milliseconds) / 1000)
+        return 1
+
+    def do_persist(self, key):
+        if self.alive(key) is None or self.data[key][1] is None:
+            return 0
+        self.data[key] = (self.data[key][0], None)
+        return 1
+
+    def do_flushdb(self):
+        self.data.clear()
+        return Status('OK')
+
+
+class Status(str):
+    pass
+
+
+class Error(str):
+    pass
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Status):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, Error):
+        return b'-%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+    @property
+    def location(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
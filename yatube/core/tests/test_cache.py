@@ -0,0 +1,209 @@
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache.redis import RedisCache
+from core.cache.sqlite import SQLiteCache
+from core.tests.fake_redis import FakeRedisServer
+
+
+class CacheBackendContract:
+    """Общие проверки поведения бэкенда как кеша Django."""
+
+    def make_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        """set/get/delete работают с любыми сериализуемыми значениями"""
+        values = {'str': 'строка', 'int': 42, 'list': [1, 'a'], 'none': None}
+        for key, value in values.items():
+            with self.subTest(key=key):
+                self.cache.set(key, value)
+                self.assertEqual(self.cache.get(key, 'default'), value)
+        self.cache.delete('str')
+        self.assertEqual(self.cache.get('str', 'default'), 'default')
+
+    def test_add_keeps_existing_value(self):
+        """add не перезаписывает существующий ключ"""
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+
+    def test_many(self):
+        """Пакетные операции за один вызов"""
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+
+    def test_incr(self):
+        """incr увеличивает число и падает на отсутствующем ключе"""
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter'), 11)
+        self.assertEqual(self.cache.decr('counter', 5), 6)
+        self.assertEqual(self.cache.get('counter'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        """Значения истекают по таймауту"""
+        self.cache.set('zero', 'value', 0)
+        self.assertIsNone(self.cache.get('zero'))
+        self.cache.set('short', 'value', 0.1)
+        self.assertTrue(self.cache.has_key('short'))
+        time.sleep(0.2)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.add('short', 'again'))
+
+    def test_touch(self):
+        """touch продлевает жизнь ключа"""
+        self.cache.set('key', 'value', 0.1)
+        self.assertTrue(self.cache.touch('key', None))
+        time.sleep(0.2)
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertFalse(self.cache.touch('missing'))
+
+    def test_shared_between_instances(self):
+        """Второй экземпляр (другой воркер) видит записи первого"""
+        other = self.make_cache()
+        self.cache.set('shared', 'value')
+        self.assertEqual(other.get('shared'), 'value')
+        other.delete('shared')
+        self.assertIsNone(self.cache.get('shared'))
+
+
+class SQLiteCacheTests(CacheBackendContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def make_cache(self):
+        return SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'),
+            {'OPTIONS': {'MAX_ENTRIES': 50}},
+        )
+
+    def test_cull(self):
+        """Размер файла ограничен MAX_ENTRIES"""
+        for index in range(200):
+            self.cache.set(f'key{index}', index)
+        count, = self.cache._connection.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()
+        self.assertLessEqual(count, 100)
+
+
+class RedisCacheTests(CacheBackendContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def make_cache(self):
+        return RedisCache(self.server.location, {})
+
+    def test_incr_is_atomic_on_server(self):
+        """Целые числа хранятся на сервере как числа"""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.server.data[b':1:counter'][0], b'1')
+
+    def test_reconnect_after_disconnect(self):
+        """Потерянное соединение восстанавливается"""
+        self.cache.set('key', 'value')
+        self.cache._connection().sock.close()
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_incr_keeps_ttl(self):
+        """incr не снимает срок жизни ключа, в том числе не целого"""
+        self.cache.set('counter', 1, 60)
+        self.cache.set('float', 1.5, 60)
+        self.cache.incr('counter')
+        self.cache.incr('float')
+        self.assertEqual(self.cache.get('float'), 2.5)
+        for key in (b':1:counter', b':1:float'):
+            with self.subTest(key=key):
+                self.assertIsNotNone(self.server.data[key][1])
+
+    def test_incr_is_not_retried(self):
+        """Оборванный incr не повторяется: счётчик не растёт дважды"""
+        self.cache.set('counter', 1)
+        connection = self.cache._connection()
+
+        def broken_pipeline(commands):
+            connection.sock.sendall(b''.join(
+                connection._encode(args) for args in commands))
+            raise socket.timeout('timed out')
+
+        connection.pipeline = broken_pipeline
+        with self.assertRaises(OSError):
+            self.cache.incr('counter')
+        # ждём, пока сервер выполнит отправленную команду
+        for _ in range(100):
+            if self.server.data[b':1:counter'][0] == b'2':
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+
+class TieredCacheTests(CacheBackendContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeRedisServer()
+        cls.server.start()
+        cls.settings_override = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'core.cache.tiered.TieredCache',
+                'LOCATION': 'shared',
+                'OPTIONS': {'LOCAL_TIMEOUT': 0.3},
+            },
+            'shared': {
+                'BACKEND': 'core.cache.redis.RedisCache',
+                'LOCATION': cls.server.location,
+            },
+        })
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        cls.server.stop()
+
+    def make_cache(self):
+        return caches['default']
+
+    def test_local_tier_absorbs_reads(self):
+        """Повторное чтение не ходит в общий кеш до LOCAL_TIMEOUT"""
+        self.cache.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+        time.sleep(0.4)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_write_reaches_shared_tier(self):
+        """Записи сразу попадают в общий кеш"""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(caches['shared'].get_many(['a', 'b']),
+                         {'a': 1, 'b': 2})
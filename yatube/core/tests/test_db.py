@@ -0,0 +1,101 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db.middleware import STICKY_COOKIE
+from core.db.router import begin_request, end_request, read_from_replica
+from posts.cache import FEED_CHANGED_KEY
+from posts.models import Post, Profile
+
+User = get_user_model()
+REPLICAS = ['replica_a', 'replica_b']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплики — отдельные SQLite-файлы, снятые копией основной базы."""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост с реплики', author=self.author)
+        primary = connections['default']
+        primary.ensure_connection()
+        for alias in REPLICAS:
+            path = os.path.join(self.directory, f'{alias}.sqlite3')
+            target = sqlite3.connect(path)
+            primary.connection.backup(target)
+            target.close()
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        # запись после снимка: реплики её ещё не получили
+        Post.objects.create(text='Пост без репликации', author=self.author)
+        self.client = Client()
+
+    def tearDown(self):
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_read_views_use_replica(self):
+        """Ленты и страница «об авторе» читают реплику"""
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('Пост с реплики', content)
+        self.assertNotIn('Пост без репликации', content)
+        self.assertEqual(
+            self.client.get(reverse('about:author')).status_code, 200)
+
+    def test_write_goes_to_primary_and_sticks(self):
+        """Запись идёт в основную базу, после неё чтение тоже оттуда"""
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('posts:post_create'), data={'text': 'Свежий пост'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertTrue(Post.objects.filter(text='Свежий пост').exists())
+        for alias in REPLICAS:
+            self.assertFalse(Post.objects.using(alias).filter(
+                text='Свежий пост').exists())
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('Свежий пост', content)
+
+    def test_outside_requests_reads_primary(self):
+        """Вне запроса чтение идёт из основной базы"""
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_lagging_replica_feed_is_not_cached(self):
+        """Ленту с реплики сразу после правки не кладём в кеш"""
+        url = reverse('posts:index')
+        self.assertNotIn(
+            'Пост без репликации', self.client.get(url).content.decode())
+        with override_settings(DATABASE_REPLICAS=[]):
+            content = self.client.get(url).content.decode()
+        self.assertIn('Пост без репликации', content)
+
+    def test_feed_from_replica_is_cached_later(self):
+        """Когда реплики догнали правку, лента с них кешируется"""
+        cache.delete(FEED_CHANGED_KEY)
+        url = reverse('posts:index')
+        self.client.get(url)
+        with override_settings(DATABASE_REPLICAS=[]):
+            content = self.client.get(url).content.decode()
+        self.assertNotIn('Пост без репликации', content)
+
+    def test_counters_rebuild_from_primary(self):
+        """Пересчёт счётчиков читает основную базу, а не реплику"""
+        begin_request(sticky=False)
+        read_from_replica()
+        try:
+            profile = Profile.objects.rebuild(self.author.pk)
+        finally:
+            end_request()
+        self.assertEqual(profile.posts_count, 2)
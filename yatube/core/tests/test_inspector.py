@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase
+
+from core.db.inspector import (
+    QueryBudgetExceeded, inspect_queries, normalize, query_budget,
+)
+from core.db.middleware import QueryInspectorMiddleware
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(text='Пост', author=User.objects.create_user(f'user{i}'))
+            for i in range(6)
+        )
+
+    def lazy_authors(self):
+        usernames = []
+        for post in Post.objects.all():
+            usernames.append(post.author.username)
+        return usernames
+
+    def test_normalize(self):
+        """Литералы и списки параметров сводятся к форме запроса"""
+        self.assertEqual(
+            normalize("SELECT 1 FROM t WHERE a = 'x''y' AND b IN (%s, %s)"),
+            'SELECT ? FROM t WHERE a = ? AND b IN (...)')
+
+    def test_n_plus_one_in_code(self):
+        """N+1 находится с местом вызова в коде"""
+        with inspect_queries() as report:
+            self.lazy_authors()
+        [(shape, site, count)] = report.n_plus_one(threshold=5)
+        self.assertEqual(count, 6)
+        self.assertIn('auth_user', shape)
+        self.assertIn('core/tests/test_inspector.py', site)
+        self.assertIn('lazy_authors', site)
+
+    def test_n_plus_one_in_template(self):
+        """Место вызова указывает на строку шаблона"""
+        template = engines['django'].from_string(
+            '{% for post in posts %}\n{{ post.author.username }}'
+            '{% endfor %}')
+        with inspect_queries() as report:
+            template.render({'posts': Post.objects.all()})
+        [(_, site, count)] = report.n_plus_one(threshold=5)
+        self.assertTrue(site.startswith('<unknown source>:2 ← '), site)
+
+    def test_budget(self):
+        """Превышение бюджета запросов и N+1 бросает исключение"""
+        with query_budget(max_queries=1):
+            list(Post.objects.select_related('author'))
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'N+1: 6 раз'):
+            with query_budget(threshold=5):
+                self.lazy_authors()
+        with self.assertRaisesMessage(
+                QueryBudgetExceeded, '7 запросов при бюджете 2'):
+            with query_budget(max_queries=2, threshold=100):
+                self.lazy_authors()
+
+    def test_middleware_logs_problems(self):
+        """Middleware пишет найденные N+1 в лог"""
+        def view(request):
+            self.lazy_authors()
+            return HttpResponse()
+
+        middleware = QueryInspectorMiddleware(view)
+        with self.assertLogs('core.db.middleware', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+        self.assertIn('GET /: N+1: 6 раз', logs.output[0])
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.jobs import (
+    RETRY_DELAY, claim_job, process_jobs, purge_finished, run_job, task,
+)
+from core.models import Job
+
+calls = []
+
+
+@task
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@task(max_attempts=2)
+def broken():
+    raise RuntimeError('Сломано')
+
+
+@override_settings(JOBS_INLINE_WORKERS=0)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_instead_of_running(self):
+        """delay() только пишет задачу в очередь"""
+        job = add.delay(2, b=3)
+        self.assertEqual(calls, [])
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.name, 'core.tests.test_jobs.add')
+
+    def test_worker_runs_and_stores_result(self):
+        """Воркер выполняет задачу и сохраняет результат"""
+        job = add.delay(2, b=3)
+        self.assertEqual(process_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(calls, [(2, 3)])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result_value, 5)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_task_is_still_callable(self):
+        """Вызов задачи напрямую выполняет её сразу"""
+        self.assertEqual(add(1, 1), 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_retries_with_backoff(self):
+        """Упавшая задача откладывается, а после попыток помечается упавшей"""
+        job = broken.delay()
+        before = timezone.now()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(process_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Сломано', job.error)
+        self.assertGreaterEqual(job.run_at, before + RETRY_DELAY)
+        self.assertIsNone(claim_job())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(process_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_abandoned_job_is_claimed_again(self):
+        """Задачу умершего воркера берёт другой"""
+        job = add.delay(1, 2)
+        claim_job()
+        self.assertIsNone(claim_job())
+        Job.objects.filter(pk=job.pk).update(
+            claimed_at=timezone.now() - timedelta(hours=1))
+        job = claim_job()
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(run_job(job))
+
+    def test_run_workers_burst(self):
+        """run_workers --burst разбирает очередь и выходит"""
+        add.delay_many([(1, 1), (2, 2)])
+        call_command('run_workers', burst=True, verbosity=0)
+        self.assertEqual(sorted(calls), [(1, 1), (2, 2)])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_purge_finished(self):
+        """Старые результаты удаляются, упавшие задачи остаются"""
+        add.delay(1, 1)
+        broken.delay()
+        Job.objects.update(
+            status=Job.DONE, finished_at=timezone.now() - timedelta(days=8))
+        Job.objects.filter(name=broken.name).update(status=Job.FAILED)
+        self.assertEqual(purge_finished(timedelta(days=7)), 1)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
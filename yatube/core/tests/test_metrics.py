@@ -0,0 +1,94 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+
+def sample(name, **labels):
+    """Значение выборки из /metrics-текста процесса или 0."""
+    for line in metrics.render().splitlines():
+        if not line.startswith(name + '{'):
+            continue
+        pairs = dict(re.findall(r'(\w+)="([^"]*)"', line))
+        if all(pairs.get(key) == str(value) for key, value in labels.items()):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+class MetricsRenderTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины гистограммы накопительные, метки экранируются"""
+        histogram = metrics.Histogram(
+            'test_seconds', 'Тест.', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, view='a"b')
+        lines = [
+            f'{name} {labels} {value}'
+            for name, labels, value in histogram.samples()
+        ]
+        self.assertEqual([line.rsplit(' ', 1)[1] for line in lines],
+                         ['1', '2', '3', '5.55', '3'])
+        self.assertEqual(
+            metrics._format_labels({'view': 'a"b', 'le': 0.1}),
+            '{view="a\\"b",le="0.1"}')
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=self.author)
+
+    def test_server_timing_and_log(self):
+        """Ответ несёт Server-Timing, запрос пишется в лог"""
+        with self.assertLogs('core.metrics.middleware', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ ')
+        self.assertIn('tpl;dur=', timing)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'posts:index')
+        self.assertEqual(entry['status'], 200)
+        self.assertGreater(entry['db_queries'], 0)
+        self.assertGreater(entry['template_ms'], 0)
+
+    def test_page_cache_hits_counted(self):
+        """Второй показ ленты приходит из кеша без SQL постов"""
+        url = reverse('posts:index')
+        hits = sample('yatube_cache_requests_total', kind='page', result='hit')
+        requests = sample('yatube_request_duration_seconds_count',
+                          view='posts:index', method='GET', status=200)
+        self.client.get(url)
+        with self.assertLogs('core.metrics.middleware', 'INFO') as logs:
+            self.client.get(url)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['template_ms'], 0)
+        self.assertGreater(entry['cache_hits'], 0)
+        self.assertEqual(sample('yatube_cache_requests_total',
+                                kind='page', result='hit'), hits + 1)
+        self.assertEqual(
+            sample('yatube_request_duration_seconds_count',
+                   view='posts:index', method='GET', status=200),
+            requests + 2)
+
+    def test_metrics_staff_only(self):
+        """Метрики доступны только персоналу"""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram',
+            response.content.decode())
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.paginator import Page, Paginator
+from django.test import TestCase
+from django.utils import timezone
+
+from core.paginator import CursorPaginator, MergedQuerySet
+from posts.models import Post
+
+User = get_user_model()
+PER_PAGE = 10
+POSTS_TOTAL = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cursor')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author)
+            for i in range(POSTS_TOTAL)
+        )
+        # половина постов с одинаковой датой: порядок решает pk
+        Post.objects.filter(pk__in=list(
+            Post.objects.values_list('pk', flat=True)[:POSTS_TOTAL // 2]
+        )).update(pub_date=timezone.now())
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+
+    def walk_forward(self):
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(
+                self.paginator.get_page(cursor=pages[-1].next_cursor)
+            )
+        return pages
+
+    def test_page_is_django_page(self):
+        """Курсорная страница совместима с Page и Paginator"""
+        page = self.paginator.get_page()
+        self.assertIsInstance(page, Page)
+        self.assertIsInstance(page.paginator, Paginator)
+        self.assertEqual(len(page), PER_PAGE)
+        self.assertFalse(page.has_previous())
+
+    def test_forward_walk_returns_every_post_once(self):
+        """Проход по next-курсорам возвращает все посты по порядку"""
+        pages = self.walk_forward()
+        walked = [post for page in pages for post in page]
+        self.assertEqual(walked, self.expected)
+        self.assertEqual(len(pages), 3)
+
+    def test_backward_walk_mirrors_forward_walk(self):
+        """previous-курсоры возвращают на те же страницы"""
+        pages = self.walk_forward()
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = self.paginator.get_page(cursor=page.previous_cursor)
+            self.assertEqual(list(page), list(expected_page))
+        self.assertFalse(page.has_previous())
+
+    def test_last_cursor(self):
+        """Курсор последней страницы отдаёт хвост ленты"""
+        page = self.paginator.get_page(cursor=self.paginator.last_cursor)
+        self.assertEqual(list(page), self.expected[-PER_PAGE:])
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page=N продолжают работать"""
+        page = self.paginator.get_page(number='2')
+        self.assertEqual(list(page), self.expected[PER_PAGE:2 * PER_PAGE])
+        self.assertTrue(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_legacy_page_out_of_range_returns_last_page(self):
+        """Слишком большой номер страницы ведёт на последнюю"""
+        page = self.paginator.get_page(number='100')
+        self.assertEqual(list(page), self.expected[-PER_PAGE:])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор не ломает страницу"""
+        for cursor in ('garbage', 'W10', '!!!'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor=cursor)
+                self.assertEqual(list(page), self.expected[:PER_PAGE])
+
+    def test_clean_cursor(self):
+        """Испорченный курсор чистится в пустой, верный ведёт туда же"""
+        for cursor in ('garbage', 'W10', '!!!', ''):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.paginator.clean_cursor(cursor), '')
+        cursor = self.paginator.get_page().next_cursor
+        clean = self.paginator.clean_cursor(cursor)
+        self.assertEqual(self.paginator.clean_cursor(clean), clean)
+        self.assertEqual(list(self.paginator.get_page(cursor=clean)),
+                         list(self.paginator.get_page(cursor=cursor)))
+
+    def test_no_count_query(self):
+        """Страница загружается одним запросом без COUNT(*)"""
+        first = self.paginator.get_page()
+        with self.assertNumQueries(1):
+            self.paginator.get_page(cursor=first.next_cursor)
+
+
+class MergedQuerySetTests(CursorPaginatorTests):
+    """Те же проверки для двух пересекающихся выборок, слитых в одну."""
+
+    def setUp(self):
+        middle = sorted(post.pk for post in self.expected)[POSTS_TOTAL // 2]
+        self.paginator = CursorPaginator(MergedQuerySet(
+            Post.objects.filter(pk__lte=middle + 2),
+            Post.objects.filter(pk__gt=middle - 2),
+        ), PER_PAGE)
+
+    def test_no_count_query(self):
+        """По одному запросу на выборку, без COUNT(*)"""
+        first = self.paginator.get_page()
+        with self.assertNumQueries(2):
+            self.paginator.get_page(cursor=first.next_cursor)
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.serving.wsgi import FileServer, static_name_is_immutable
+
+TEMP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+STYLES = b'body { color: black; }\n' * 100
+
+
+def fallback(environ, start_response):
+    start_response('404 Not Found', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+class Call:
+    """Вызов WSGI-приложения с собранным ответом."""
+
+    def __init__(self, application, path, **headers):
+        environ = {'PATH_INFO': path}
+        environ.update(
+            (f'HTTP_{name.upper()}', value) for name, value in headers.items())
+        setup_testing_defaults(environ)
+        self.body = b''.join(application(environ, self.start_response))
+
+    def start_response(self, status, headers):
+        self.status = int(status.split()[0])
+        self.headers = dict(headers)
+
+
+class FileServerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = os.path.join(TEMP_ROOT, 'files')
+        os.makedirs(cls.root, exist_ok=True)
+        with open(os.path.join(cls.root, 'site.0123456789ab.css'), 'wb') as f:
+            f.write(STYLES)
+        with open(os.path.join(
+                cls.root, 'site.0123456789ab.css.gz'), 'wb') as f:
+            f.write(gzip.compress(STYLES))
+        os.makedirs(os.path.join(cls.root, 'incoming'), exist_ok=True)
+        with open(os.path.join(cls.root, 'incoming', 'raw.css'), 'wb') as f:
+            f.write(STYLES)
+        cls.app = FileServer(fallback, [
+            ('/static/', cls.root, static_name_is_immutable,
+             lambda name: name.startswith('incoming/')),
+        ])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_ROOT, ignore_errors=True)
+
+    def test_serves_compressed_copy(self):
+        """Клиент с gzip получает сжатую копию и бессрочный кеш"""
+        call = Call(self.app, '/static/site.0123456789ab.css',
+                    accept_encoding='gzip, deflate')
+        self.assertEqual(call.status, 200)
+        self.assertEqual(call.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(call.headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', call.headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(call.body), STYLES)
+
+    def test_serves_identity_without_accept_encoding(self):
+        """Без Accept-Encoding отдаётся несжатый файл"""
+        call = Call(self.app, '/static/site.0123456789ab.css')
+        self.assertNotIn('Content-Encoding', call.headers)
+        self.assertEqual(call.body, STYLES)
+        self.assertEqual(call.headers['Content-Type'],
+                         'text/css; charset=utf-8')
+
+    def test_not_modified(self):
+        """Совпавший ETag — 304 без тела"""
+        etag = Call(self.app, '/static/site.0123456789ab.css').headers['ETag']
+        call = Call(self.app, '/static/site.0123456789ab.css',
+                    if_none_match=etag)
+        self.assertEqual(call.status, 304)
+        self.assertEqual(call.body, b'')
+
+    def test_range(self):
+        """Range отдаёт часть файла, невыполнимый — 416"""
+        call = Call(self.app, '/static/site.0123456789ab.css',
+                    range='bytes=5-9', accept_encoding='gzip')
+        self.assertEqual(call.status, 206)
+        self.assertEqual(call.body, STYLES[5:10])
+        self.assertEqual(call.headers['Content-Range'],
+                         f'bytes 5-9/{len(STYLES)}')
+        call = Call(self.app, '/static/site.0123456789ab.css',
+                    range='bytes=-4')
+        self.assertEqual(call.body, STYLES[-4:])
+        call = Call(self.app, '/static/site.0123456789ab.css',
+                    range=f'bytes={len(STYLES)}-')
+        self.assertEqual(call.status, 416)
+
+    def test_unknown_paths_go_to_application(self):
+        """Чужие, закрытые и отсутствующие пути и выход наружу — приложению"""
+        for path in ('/static/missing.css', '/static/../test_serving.py',
+                     '/posts/', '/static/incoming/raw.css',
+                     '/static/./incoming/raw.css'):
+            with self.subTest(path=path):
+                self.assertEqual(Call(self.app, path).body, b'django')
+
+
+@override_settings(
+    STATIC_ROOT=os.path.join(TEMP_ROOT, 'collected'),
+    STATICFILES_STORAGE='core.serving.storage.CompressedManifestStorage',
+)
+class CompressedManifestStorageTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_ROOT, ignore_errors=True)
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """collectstatic даёт имена с хешем и сжатые копии"""
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(
+                settings.STATIC_ROOT, 'staticfiles.json')) as manifest:
+            paths = json.load(manifest)['paths']
+        css = os.path.join(
+            settings.STATIC_ROOT, paths['css/bootstrap.min.css'])
+        self.assertTrue(static_name_is_immutable(css))
+        with open(css, 'rb') as original, open(css + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), original.read())
+        # PNG уже сжат: копия не нужна
+        self.assertFalse(os.path.exists(os.path.join(
+            settings.STATIC_ROOT, paths['img/logo.png'] + '.gz')))
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.management.commands.collect_media import Command as CollectMedia
+from core.models import StoredFile
+from core.storage import is_hashed, media_storage
+from core.views import media
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_INLINE_WORKERS=0)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='С картинкой', author=self.author,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def refs(self, name):
+        return StoredFile.objects.get(name=name).refs
+
+    def test_name_is_sharded_content_hash(self):
+        """Имя файла — хеш содержимого, разложенный по каталогам"""
+        name = media_storage.save('docs/a.TXT', ContentFile(b'data'))
+        digest = ('3a6eb0790f39ac87c94f3856b2dd2c5d'
+                  '110e6811602261a9a923d3bb23adc8b7')
+        self.assertEqual(name, f'docs/3a/6e/{digest}.txt')
+        self.assertTrue(is_hashed(name))
+        self.assertEqual(StoredFile.objects.get(name=name).size, 4)
+
+    def test_identical_files_are_stored_once(self):
+        """Одинаковые загрузки — один файл с двумя ссылками"""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            first.image.path))), 1)
+        self.assertEqual(self.refs(first.image.name), 2)
+        second.delete()
+        self.assertEqual(self.refs(first.image.name), 1)
+
+    def test_changing_image_moves_reference(self):
+        """Смена картинки переносит ссылку на новый файл"""
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = media_storage.save('posts/new.txt', ContentFile(b'x'))
+        post.save()
+        self.assertEqual(self.refs(old_name), 0)
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_collect_media_removes_unreferenced(self):
+        """collect_media удаляет файлы без ссылок и не трогает остальные"""
+        kept = self.create_post()
+        unreferenced = self.create_post('other.gif')
+        unreferenced.image = ''
+        unreferenced.save()
+        orphan = media_storage.save('posts/orphan.txt', ContentFile(b'o'))
+        StoredFile.objects.filter(name=orphan).delete()
+        # bulk-операции обходят сигналы: счётчик пересчитывается
+        StoredFile.objects.filter(name=kept.image.name).update(refs=0)
+        StoredFile.objects.update(
+            created=timezone.now() - timedelta(days=2))
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(media_storage.path(orphan), (old, old))
+
+        call_command('collect_media', verbosity=0)
+        self.assertTrue(media_storage.exists(kept.image.name))
+        self.assertEqual(self.refs(kept.image.name), 1)
+        self.assertFalse(media_storage.exists(orphan))
+
+    def test_collect_media_keeps_fresh_uploads(self):
+        """Файл, чей пост ещё не сохранён, не удаляется"""
+        name = media_storage.save('posts/fresh.txt', ContentFile(b'f'))
+        call_command('collect_media', verbosity=0)
+        self.assertTrue(media_storage.exists(name))
+
+    def test_collect_media_spares_reuploaded_file(self):
+        """Файл, загруженный снова во время сборки, не удаляется"""
+        post = self.create_post()
+        name = post.image.name
+        post.image = ''
+        post.save()
+        StoredFile.objects.update(
+            created=timezone.now() - timedelta(days=2))
+        cutoff = timezone.now() - timedelta(hours=24)
+        # сборщик уже выбрал файл, а его загрузили ещё раз
+        self.assertEqual(self.create_post('again.gif').image.name, name)
+        self.assertFalse(CollectMedia().delete(name, cutoff))
+        self.assertTrue(media_storage.exists(name))
+        self.assertEqual(self.refs(name), 1)
+
+    def test_hashed_media_is_immutable(self):
+        """Файл с именем из хеша отдаётся с бессрочным кешированием"""
+        name = media_storage.save('posts/small.gif', ContentFile(SMALL_GIF))
+        request = RequestFactory().get(media_storage.url(name))
+        response = media(request, name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_incoming_uploads_are_not_served(self):
+        """Необработанные загрузки наружу не отдаются"""
+        post = self.create_post()
+        request = RequestFactory().get(post.image.url)
+        for name in (post.image.name, post.image.name.replace(
+                'posts/incoming/', 'posts/./incoming/')):
+            with self.subTest(name=name):
+                with self.assertRaises(Http404):
+                    media(request, name)
@@ -0,0 +1,40 @@
+from copy import deepcopy
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from core.templates import project_template_names, warm_up
+
+CACHED_TEMPLATES = deepcopy(settings.TEMPLATES)
+CACHED_TEMPLATES[0]['APP_DIRS'] = False
+CACHED_TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+@override_settings(TEMPLATES=CACHED_TEMPLATES)
+class TemplateWarmUpTests(SimpleTestCase):
+    def test_project_template_names(self):
+        """Прогреваются шаблоны проекта, а не админки"""
+        names = project_template_names(engines['django'].engine)
+        self.assertIn('posts/index.html', names)
+        self.assertIn('includes/header.html', names)
+        self.assertFalse(
+            [name for name in names if name.startswith('admin/')])
+
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев заполняет кеш загрузчика шаблонов"""
+        engine = engines['django'].engine
+        [loader] = engine.template_loaders
+        loader.reset()
+        count = warm_up()
+        self.assertEqual(count, len(project_template_names(engine)))
+        self.assertIn('posts/index.html', loader.get_template_cache)
+        # повторная загрузка берёт готовый объект из кеша
+        self.assertIs(
+            engine.get_template('posts/index.html'),
+            loader.get_template_cache['posts/index.html'])
@@ -1,5 +1,15 @@
 # core/views.py
+import posixpath
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.views.static import serve
+
+from . import metrics as process_metrics
+from .serving import IMMUTABLE_CACHE_CONTROL
+from .storage import is_hashed, is_private
 
 
 def page_not_found(request, exception):
@@ -8,3 +18,21 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        process_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def media(request, path):
+    """Медиафайл; файлы с именем из хеша кешируются бессрочно."""
+    if is_private(posixpath.normpath(path).lstrip('/')):
+        raise Http404(path)
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200 and is_hashed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Post, Group
+from .models import Follow, Post, Group, Profile
+from .search import search_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,24 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # обратный индекс вместо LIKE '%...%' по всей таблице
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'posts_count',
+        'comments_count',
+    )
+    readonly_fields = ('posts_count', 'comments_count')
+    search_fields = ('user__username',)
+
 
 admin.site.register(Post, PostAdmin)
+admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Group)
+admin.site.register(Follow)
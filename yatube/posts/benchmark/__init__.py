@@ -0,0 +1,5 @@
+"""Нагрузочные замеры страниц постов: генератор данных и прогонщик.
+
+Запускаются командой benchmark, результат — JSON, который можно
+сравнить с результатом другого коммита.
+"""
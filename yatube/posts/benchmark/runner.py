@@ -0,0 +1,254 @@
+"""Прогон сценариев через тестовый клиент и через локальный WSGI-сервер.
+
+Число SQL-запросов берётся из заголовка Server-Timing, который ставит
+MetricsMiddleware, поэтому оно одинаково доступно обоим транспортам.
+"""
+import http.client
+import math
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from .seed import GROUP_PREFIX, USERNAME_PREFIX
+
+SCENARIOS = (
+    'index', 'group_posts', 'profile', 'post_detail',
+    'post_create', 'add_comment',
+)
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+TEMPLATE_TIME = re.compile(r'tpl;dur=([\d.]+)')
+Sample = namedtuple('Sample', 'status elapsed queries template_ms')
+# сколько id постов держать для случайного выбора
+POSTS_SAMPLE = 10000
+
+
+class Targets:
+    """Случайные, но воспроизводимые адреса и данные сценариев."""
+
+    def __init__(self, random_seed=0):
+        self.rng = random.Random(random_seed)
+        self.usernames = list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX,
+        ).order_by('pk').values_list('username', flat=True))
+        self.slugs = list(Group.objects.filter(
+            slug__startswith=GROUP_PREFIX,
+        ).order_by('pk').values_list('slug', flat=True))
+        self.post_ids = list(Post.objects.filter(
+            author__username__startswith=USERNAME_PREFIX,
+        ).order_by('-pk').values_list('pk', flat=True)[:POSTS_SAMPLE])
+        if not (self.usernames and self.slugs and self.post_ids):
+            raise ValueError('Нет данных для замеров, нужен seed')
+        self.user = User.objects.get(username=self.usernames[0])
+
+    def request(self, scenario):
+        """(метод, путь, данные формы, нужен ли вход)."""
+        rng = self.rng
+        if scenario == 'index':
+            return 'GET', reverse('posts:index'), None, False
+        if scenario == 'group_posts':
+            return 'GET', reverse(
+                'posts:group_list', args=(rng.choice(self.slugs),)
+            ), None, False
+        if scenario == 'profile':
+            return 'GET', reverse(
+                'posts:profile', args=(rng.choice(self.usernames),)
+            ), None, False
+        if scenario == 'post_detail':
+            return 'GET', reverse(
+                'posts:post_detail', args=(rng.choice(self.post_ids),)
+            ), None, False
+        if scenario == 'post_create':
+            return 'POST', reverse('posts:post_create'), {
+                'text': f'Пост замера {rng.random()}',
+            }, True
+        if scenario == 'add_comment':
+            return 'POST', reverse(
+                'posts:add_comment', args=(rng.choice(self.post_ids),)
+            ), {'text': f'Комментарий замера {rng.random()}'}, True
+        raise ValueError(f'Неизвестный сценарий: {scenario}')
+
+
+class ClientTransport:
+    """Тестовый клиент Django: запрос без сети и сервера."""
+    name = 'client'
+    concurrency = 1
+
+    def __init__(self, targets):
+        self.guest = Client()
+        self.member = Client()
+        self.member.force_login(targets.user)
+
+    def send(self, method, path, data, login):
+        client = self.member if login else self.guest
+        started = time.perf_counter()
+        if method == 'POST':
+            response = client.post(path, data)
+        else:
+            response = client.get(path)
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, response.get('Server-Timing')
+
+    def close(self):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGITransport:
+    """Настоящий HTTP через wsgiref-сервер в потоке этого процесса."""
+    name = 'wsgi'
+
+    def __init__(self, targets, concurrency=1):
+        self.concurrency = concurrency
+        self.server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        client = Client()
+        client.force_login(targets.user)
+        self.cookies = {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+        }
+        _, headers = self.fetch(
+            'GET', reverse('posts:post_create'), login=True)
+        cookie = SimpleCookie()
+        for header in headers.get_all('Set-Cookie') or ():
+            cookie.load(header)
+        self.cookies[settings.CSRF_COOKIE_NAME] = (
+            cookie[settings.CSRF_COOKIE_NAME].value)
+
+    def fetch(self, method, path, data=None, login=False):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        headers = {'Host': '127.0.0.1'}
+        if login:
+            headers['Cookie'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if method == 'POST':
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies[settings.CSRF_COOKIE_NAME]
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status, response.headers
+        finally:
+            connection.close()
+
+    def send(self, method, path, data, login):
+        started = time.perf_counter()
+        status, headers = self.fetch(method, path, data, login)
+        elapsed = time.perf_counter() - started
+        return status, elapsed, headers.get('Server-Timing')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def summarize(samples, wall_time):
+    latencies = sorted(sample.elapsed for sample in samples)
+    queries = [sample.queries for sample in samples
+               if sample.queries is not None]
+    renders = [sample.template_ms for sample in samples
+               if sample.template_ms is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample.status >= 400),
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'mean_ms': _ms(sum(latencies) / len(latencies)),
+        'throughput_rps': round(len(samples) / wall_time, 1),
+        'queries_mean': _mean(queries),
+        'queries_max': max(queries) if queries else None,
+        'template_mean_ms': _mean(renders),
+    }
+
+
+def run_scenario(transport, targets, scenario, requests, warmup=0,
+                 cold=False):
+    """Прогоняет сценарий; warmup первых запросов не учитываются."""
+    plan = [targets.request(scenario) for _ in range(warmup + requests)]
+
+    def send(request):
+        if cold:
+            cache.clear()
+        status, elapsed, timing = transport.send(*request)
+        queries = QUERIES.search(timing or '')
+        render = TEMPLATE_TIME.search(timing or '')
+        return Sample(
+            status, elapsed,
+            int(queries.group(1)) if queries else None,
+            float(render.group(1)) if render else None,
+        )
+
+    for request in plan[:warmup]:
+        send(request)
+    started = time.perf_counter()
+    if transport.concurrency > 1:
+        with ThreadPoolExecutor(transport.concurrency) as pool:
+            samples = list(pool.map(send, plan[warmup:]))
+    else:
+        samples = [send(request) for request in plan[warmup:]]
+    return summarize(samples, time.perf_counter() - started)
+
+
+def compare(current, baseline, tolerance):
+    """Строки сравнения p95 и список ухудшений больше tolerance %."""
+    rows, regressions = [], []
+    for transport, scenarios in current['results'].items():
+        for scenario, stats in scenarios.items():
+            base = baseline.get('results', {}).get(
+                transport, {}).get(scenario)
+            if not base or not base.get('p95_ms'):
+                continue
+            change = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            row = (f'{transport}/{scenario}: p95 {base["p95_ms"]} → '
+                   f'{stats["p95_ms"]} мс ({change:+.0f}%), запросов '
+                   f'{base.get("queries_mean")} → {stats["queries_mean"]}')
+            rows.append(row)
+            if change > tolerance:
+                regressions.append(row)
+    return rows, regressions
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
@@ -0,0 +1,188 @@
+"""Генератор данных для замеров.
+
+Данные детерминированы: одни и те же масштаб и random_seed дают те же
+тексты, авторов, даты и подписки, поэтому замеры разных коммитов
+сравнимы. Все пользователи и группы помечены префиксами и удаляются
+flush().
+"""
+import io
+import random
+from array import array
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts.cache import bump_feed_version
+from posts.importer import insert_with_dates
+from posts.models import Comment, Follow, Group, Post, Profile, User
+from posts.search import rebuild_index
+from posts.timeline import rebuild_timelines
+
+SCALES = {
+    'tiny': {'users': 10, 'groups': 3, 'posts': 200, 'comments': 400,
+             'follows': 3},
+    'small': {'users': 100, 'groups': 10, 'posts': 10000,
+              'comments': 30000, 'follows': 10},
+    'medium': {'users': 1000, 'groups': 30, 'posts': 200000,
+               'comments': 500000, 'follows': 20},
+    'large': {'users': 10000, 'groups': 100, 'posts': 2000000,
+              'comments': 5000000, 'follows': 50},
+}
+USERNAME_PREFIX = 'bench_user_'
+GROUP_PREFIX = 'bench-group-'
+IMAGE_DIR = 'posts/bench/'
+IMAGES = 20
+# картинка у каждого IMAGE_EVERY-го поста
+IMAGE_EVERY = 10
+SENTENCES = 500
+BATCH_SIZE = 5000
+PERIOD = timedelta(days=365)
+
+
+def is_seeded():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX).exists()
+
+
+def flush():
+    """Удаляет данные замеров вместе с постами и комментариями."""
+    with transaction.atomic():
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        Group.objects.filter(slug__startswith=GROUP_PREFIX).delete()
+    bump_feed_version()
+
+
+def seed(scale, random_seed=0, batch_size=BATCH_SIZE):
+    """Наполняет базу; возвращает число созданных строк по таблицам."""
+    sizes = SCALES[scale]
+    rng = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    # от полуночи, а не от текущего момента: даты те же в течение дня
+    now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    users = _seed_users(fake, sizes['users'])
+    groups = _seed_groups(fake, sizes['groups'])
+    images = _seed_images()
+    sentences = [fake.sentence(nb_words=10) for _ in range(SENTENCES)]
+
+    def text(words):
+        return ' '.join(rng.choice(sentences) for _ in range(words))
+
+    def moment():
+        return now - timedelta(
+            seconds=rng.randrange(int(PERIOD.total_seconds())))
+
+    def posts():
+        for number in range(sizes['posts']):
+            pub_date = moment()
+            yield Post(
+                text=text(rng.randint(1, 5)),
+                author_id=rng.choice(users),
+                group_id=rng.choice(groups) if rng.random() < 0.7 else None,
+                image=(rng.choice(images)
+                       if number % IMAGE_EVERY == 0 else ''),
+                pub_date=pub_date,
+                updated=pub_date,
+            )
+
+    _insert(Post, posts(), batch_size, keep_dates=True)
+    post_ids = array('q', Post.objects.filter(
+        author__username__startswith=USERNAME_PREFIX,
+    ).values_list('pk', flat=True).order_by('pk'))
+
+    def comments():
+        for _ in range(sizes['comments']):
+            yield Comment(
+                post_id=rng.choice(post_ids),
+                author_id=rng.choice(users),
+                text=text(1),
+                created=moment(),
+            )
+
+    _insert(Comment, comments(), batch_size, keep_dates=True)
+
+    follows = (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in users
+        for author_id in rng.sample(
+            users, min(sizes['follows'], len(users)))
+        if author_id != user_id
+    )
+    _insert(Follow, follows, batch_size, ignore_conflicts=True)
+
+    bench_users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    rebuild_index(Post.objects.filter(author__in=bench_users))
+    rebuild_timelines(bench_users)
+    with transaction.atomic():
+        Profile.objects.rebuild_all()
+    bump_feed_version()
+    return {
+        'users': len(users),
+        'groups': len(groups),
+        'posts': len(post_ids),
+        'comments': sizes['comments'],
+    }
+
+
+def _insert(model, objs, batch_size, ignore_conflicts=False,
+            keep_dates=False):
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, batch_size))
+        if not batch:
+            return
+        limit = connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, batch)
+        size = min(batch_size, limit or batch_size)
+        with transaction.atomic():
+            if keep_dates:
+                insert_with_dates(model, batch, size, ignore_conflicts)
+            else:
+                model.objects.bulk_create(
+                    batch, batch_size=size,
+                    ignore_conflicts=ignore_conflicts)
+
+
+def _seed_users(fake, count):
+    User.objects.bulk_create(
+        User(username=f'{USERNAME_PREFIX}{number}',
+             first_name=fake.first_name(), last_name=fake.last_name())
+        for number in range(count)
+    )
+    return list(User.objects.filter(
+        username__startswith=USERNAME_PREFIX,
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def _seed_groups(fake, count):
+    Group.objects.bulk_create(
+        Group(title=fake.catch_phrase()[:200],
+              slug=f'{GROUP_PREFIX}{number}',
+              description=fake.paragraph())
+        for number in range(count)
+    )
+    return list(Group.objects.filter(
+        slug__startswith=GROUP_PREFIX,
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def _seed_images():
+    """Небольшой набор картинок, общий для всех постов с картинкой."""
+    names = []
+    for number in range(IMAGES):
+        name = f'{IMAGE_DIR}{number}.jpg'
+        if not default_storage.exists(name):
+            rng = random.Random(number)
+            image = Image.new('RGB', (1200, 800), tuple(
+                rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG')
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
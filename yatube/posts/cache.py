@@ -0,0 +1,213 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.db.router import reading_replica
+
+FEED_VERSION_KEY = 'feed_version'
+# живёт REPLICA_STICKY_SECONDS после правки ленты: реплики могут отставать
+FEED_CHANGED_KEY = 'feed_version_changed'
+# метка личной вставки в общем теле страницы; текст постов экранируется,
+# поэтому подделать её из содержимого нельзя
+PERSONAL_MARKER = '<!--personal:{}-->'
+
+
+def post_card_key(post_id, updated):
+    """Ключ карточки меняется вместе с датой изменения поста."""
+    return f'post_card:{post_id}:{updated.timestamp():.6f}'
+
+
+def invalidate_post_cards(posts):
+    """Удаляет карточки постов из queryset."""
+    keys = [
+        post_card_key(post_id, updated)
+        for post_id, updated in posts.values_list('pk', 'updated').iterator()
+    ]
+    cache.delete_many(keys)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # после вытеснения начинаем с отметки времени, а не с нуля,
+        # чтобы не поднять из кеша старые страницы
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_feed_version():
+    return get_version(FEED_VERSION_KEY)
+
+
+def bump_feed_version():
+    bump_version(FEED_VERSION_KEY)
+    cache.set(FEED_CHANGED_KEY, True, settings.REPLICA_STICKY_SECONDS)
+
+
+def comments_version_key(post_id):
+    return f'comments_version:{post_id}'
+
+
+def get_comments_version(post_id):
+    """Версия блока комментариев поста: входит в ключ фрагмента."""
+    return get_version(comments_version_key(post_id))
+
+
+def bump_comments_version(post_id):
+    bump_version(comments_version_key(post_id))
+
+
+def personal_version_key(user_id):
+    return f'personal_version:{user_id}'
+
+
+def bump_personal_version(user_id):
+    """Сбрасывает личные вставки пользователя во всех его сессиях."""
+    bump_version(personal_version_key(user_id))
+
+
+def personal_fragment_key(request, template_name, context):
+    if request.user.is_authenticated:
+        owner = (request.session.session_key,
+                 get_version(personal_version_key(request.user.pk)))
+    else:
+        # у гостей вставки одинаковые, сессия им не нужна
+        owner = ('anonymous',)
+    # шапка подсвечивает пункт меню текущей страницы
+    view_name = getattr(request.resolver_match, 'view_name', None)
+    raw = ':'.join(map(str, (
+        *owner, view_name, template_name,
+        *sorted(context.items()),
+    )))
+    return f'personal:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def fill_personal(request, content, fragments):
+    """Подставляет в общее тело личные вставки текущего пользователя.
+
+    Вставки кешируются на сессию и берутся одним get_many; рендерятся
+    только промахи.
+    """
+    if not fragments:
+        return content
+    keys = [personal_fragment_key(request, template_name, context)
+            for template_name, context in fragments]
+    found = cache.get_many(keys)
+    rendered = {
+        key: render_to_string(template_name, context, request=request)
+        for key, (template_name, context) in zip(keys, fragments)
+        if key not in found
+    }
+    if rendered:
+        cache.set_many(rendered, settings.PERSONAL_CACHE_TIMEOUT)
+        found.update(rendered)
+    for index, key in enumerate(keys):
+        content = content.replace(
+            PERSONAL_MARKER.format(index), found[key], 1)
+    return content
+
+
+def cache_feed_page(timeout, key_prefix):
+    """Кеш ленты, общий для гостей и авторизованных.
+
+    Тело страницы рендерится без личных вставок ({% personal %} оставляет
+    на их месте метки) и кешируется одно на адрес с курсором; ключ
+    сбрасывается при любом изменении ленты. При ответе метки заменяются
+    вставками текущего пользователя.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'feed_body:{key_prefix}:{get_feed_version()}:{path}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, fragments, content_type = cached
+                return HttpResponse(
+                    fill_personal(request, content, fragments),
+                    content_type=content_type)
+            request.personal_fragments = fragments = []
+            try:
+                response = view_func(request, *args, **kwargs)
+            finally:
+                # страница ошибки рендерится уже целиком
+                del request.personal_fragments
+            if response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            if response.status_code == 200 and not (
+                    # лента с отставшей реплики закрепилась бы под новой
+                    # версией на весь timeout
+                    reading_replica() and cache.get(FEED_CHANGED_KEY)):
+                cache.set(
+                    key, (content, fragments, response['Content-Type']),
+                    timeout)
+            if fragments:
+                response.content = fill_personal(request, content, fragments)
+            return response
+        return _wrapped_view
+    return decorator
+
+
+def _page_etag(request, *versions):
+    # страница зависит от пользователя и его личных вставок (шапка,
+    # кнопка подписки) и от CSRF-токена в формах
+    if request.user.is_authenticated:
+        user = (request.user.pk,
+                get_version(personal_version_key(request.user.pk)))
+    else:
+        user = ('anonymous',)
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    raw = ':'.join(map(str, (*user, csrf, *versions)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_etag(request, *args, **kwargs):
+    """Валидатор ленты: версия ленты меняется при любой правке на ней."""
+    return _page_etag(request, get_feed_version())
+
+
+def post_etag(request, post_id):
+    return _page_etag(
+        request, get_feed_version(), get_comments_version(post_id))
+
+
+def conditional_page(etag_func, shared_max_age=0):
+    """Отвечает 304 по ETag без рендера и выставляет Cache-Control.
+
+    Браузер перепроверяет страницу при каждом показе; анонимную
+    страницу общий кеш (CDN) может отдавать shared_max_age секунд.
+    """
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(
+                    response, private=True, max_age=0, must_revalidate=True)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=0,
+                    s_maxage=shared_max_age, must_revalidate=True)
+            return response
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,148 @@
+"""Обработка загруженных картинок постов.
+
+Форма сохраняет загрузку как есть, а фоновая задача ingest_post_image
+один раз декодирует её, поворачивает по EXIF, уменьшает до
+IMAGE_MAX_SIZE, выбрасывает метаданные и перекодирует в IMAGE_FORMAT.
+Результат ложится в posts/ хранилища с адресацией по содержимому, а
+загрузка — из posts/incoming/ — удаляется. Миниатюры строятся уже из
+обработанной картинки, а не из многомегабайтного оригинала.
+"""
+import logging
+import re
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, ImageSequence
+
+from core.jobs import task
+from core.metrics import counter
+from core.models import StoredFile
+from core.storage import media_storage
+
+from .cache import bump_feed_version, invalidate_post_cards
+from .models import Post
+from .thumbnails import enqueue_thumbnail
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = 'posts'
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png', 'GIF': 'gif'}
+# обработанные картинки: posts/ab/cd/<sha256>.jpg, до разбиения на
+# каталоги — posts/<sha256>.jpg
+INGESTED_NAME = re.compile(
+    rf'^{UPLOAD_DIR}/(?:[0-9a-f]{{2}}/[0-9a-f]{{2}}/)?[0-9a-f]{{64}}'
+    rf'\.({"|".join(EXTENSIONS.values())})$')
+ANIMATION_FORMATS = ('GIF', 'WEBP', 'PNG')
+IMAGE_BYTES = counter(
+    'yatube_image_ingest_bytes_total',
+    'Байты картинок до и после обработки.', labels=('stage',))
+
+Processed = namedtuple('Processed', 'data extension')
+
+
+def is_ingested(name):
+    return bool(INGESTED_NAME.match(name))
+
+
+def process_image(data):
+    """Байты загрузки → Processed с перекодированной картинкой.
+
+    Анимации только пересобираются кадр в кадр, без метаданных.
+    Картинки с прозрачностью вместо JPEG сохраняются в PNG.
+    """
+    image = Image.open(BytesIO(data))
+    if getattr(image, 'is_animated', False):
+        return strip_animation(image)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(
+        (settings.IMAGE_MAX_SIZE, settings.IMAGE_MAX_SIZE), Image.LANCZOS)
+    image_format = settings.IMAGE_FORMAT
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    if image_format == 'JPEG' and has_alpha:
+        image_format = 'PNG'
+    if image_format == 'JPEG' or not has_alpha:
+        image = image.convert('RGB')
+    elif image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    # без exif=... Pillow не переносит метаданные в новый файл
+    image.save(
+        buffer, image_format, quality=settings.IMAGE_QUALITY,
+        optimize=True, progressive=image_format == 'JPEG')
+    return Processed(buffer.getvalue(), EXTENSIONS[image_format])
+
+
+def strip_animation(image):
+    """Анимация без EXIF, XMP и комментариев; размер и кадры те же."""
+    image_format = (image.format if image.format in ANIMATION_FORMATS
+                    else 'GIF')
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        copy = frame.copy()
+        # длительность кадра WebP известна только после его загрузки
+        durations.append(copy.info.get('duration') or 100)
+        # метаданные Pillow переносит в файл из info
+        copy.info = {}
+        frames.append(copy)
+    buffer = BytesIO()
+    frames[0].save(
+        buffer, image_format, save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0))
+    return Processed(buffer.getvalue(), EXTENSIONS[image_format])
+
+
+def store(processed):
+    """Кладёт картинку в хранилище; возвращает имя из хеша содержимого."""
+    return media_storage.save(
+        f'{UPLOAD_DIR}/image.{processed.extension}',
+        ContentFile(processed.data))
+
+
+def ingest_file(name):
+    """Обрабатывает файл хранилища; (новое имя, байт до, байт после)."""
+    with media_storage.open(name) as original:
+        data = original.read()
+    processed = process_image(data)
+    return store(processed), len(data), len(processed.data)
+
+
+def replace_image(old_name, new_name):
+    """Переключает посты на обработанную картинку и удаляет оригинал."""
+    if old_name == new_name:
+        return 0
+    pks = list(
+        Post.objects.filter(image=old_name).values_list('pk', flat=True))
+    replaced = Post.objects.filter(pk__in=pks, image=old_name).update(
+        image=new_name)
+    # карточки закешированы со ссылкой на оригинал; update() не меняет
+    # updated, поэтому сбрасываем их после записи, а не до неё
+    invalidate_post_cards(Post.objects.filter(pk__in=pks))
+    if replaced:
+        # update() обходит сигналы, счётчики ссылок переносим сами
+        StoredFile.objects.add_reference(new_name, replaced)
+        StoredFile.objects.add_reference(old_name, -replaced)
+        bump_feed_version()
+    if not Post.objects.filter(image=old_name).exists():
+        media_storage.delete(old_name)
+    return replaced
+
+
+@task
+def ingest_post_image(image_name):
+    """Фоновая обработка загрузки; результат — сэкономленные байты."""
+    if not image_name or is_ingested(image_name):
+        return 0
+    if not Post.objects.filter(image=image_name).exists():
+        # пост удалили или сменили ему картинку, пока задача ждала
+        return 0
+    new_name, before, after = ingest_file(image_name)
+    replace_image(image_name, new_name)
+    enqueue_thumbnail(new_name)
+    IMAGE_BYTES.inc(before, stage='original')
+    IMAGE_BYTES.inc(after, stage='stored')
+    logger.info('Картинка %s → %s: %s → %s байт',
+                image_name, new_name, before, after)
+    return before - after
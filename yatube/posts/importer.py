@@ -0,0 +1,226 @@
+"""Массовый импорт постов и комментариев из NDJSON.
+
+Строки в формате выгрузки export_posts. Авторы и группы ищутся по
+словарям, загруженным один раз, строки вставляются bulk_create внутри
+транзакции на каждую порцию. Сигналы при этом не срабатывают, поэтому
+поиск, счётчики и ленты досчитываются в finish().
+"""
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import bump_comments_version, bump_feed_version
+from .models import Comment, Group, Post, Profile, User
+from .search import rebuild_index
+from .timeline import rebuild_timelines
+
+BATCH_SIZE = 1000
+COMMIT_EVERY = 10000
+
+
+# по этим полям узнаются уже импортированные строки без id
+NATURAL_KEYS = {
+    Post: ('author_id', 'pub_date', 'text'),
+    Comment: ('post_id', 'author_id', 'created', 'text'),
+}
+
+
+def insert_with_dates(model, objs, batch_size, ignore_conflicts=False):
+    """bulk_create, при котором даты берутся из объектов.
+
+    Вставка идёт в режиме raw, как у loaddata: pre_save полей не
+    вызывается, и auto_now/auto_now_add не затирают заданные даты.
+    Общие для процесса объекты Field при этом не меняются.
+    """
+    fields = model._meta.concrete_fields
+    groups = (
+        (fields, [obj for obj in objs if obj.pk is not None]),
+        ([field for field in fields if field is not model._meta.pk],
+         [obj for obj in objs if obj.pk is None]),
+    )
+    for group_fields, group in groups:
+        for start in range(0, len(group), batch_size):
+            model._base_manager._insert(
+                group[start:start + batch_size], group_fields, raw=True,
+                ignore_conflicts=ignore_conflicts)
+
+
+class Importer:
+    """Импорт одной модели: posts или comments.
+
+    Строки с явным id сохраняют его, строки без id узнаются по
+    NATURAL_KEYS. Уже импортированные строки пропускаются, поэтому
+    порцию можно безопасно повторить; imported считает только новые.
+    """
+
+    def __init__(self, model_name, batch_size=BATCH_SIZE,
+                 commit_every=COMMIT_EVERY):
+        self.model = {'posts': Post, 'comments': Comment}[model_name]
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.imported = 0
+        self.errors = []
+        self.explicit_ids = False
+
+    def run(self, lines, start=0, on_commit=None):
+        """Импортирует строки, пропустив первые start.
+
+        on_commit(n) вызывается после каждой транзакции с числом уже
+        прочитанных строк — по нему импорт продолжают после обрыва.
+        """
+        numbered = islice(enumerate(lines, 1), start, None)
+        while True:
+            chunk = list(islice(numbered, self.commit_every))
+            if not chunk:
+                break
+            self.insert(self.build_chunk(chunk))
+            if on_commit is not None:
+                on_commit(chunk[-1][0])
+
+    def build_chunk(self, chunk):
+        rows = []
+        for number, line in chunk:
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, self.build(json.loads(line))))
+            except (ValueError, ValidationError) as error:
+                self.errors.append((number, _message(error)))
+        if self.model is Comment:
+            rows = self.drop_orphans(rows)
+        return [obj for _, obj in rows]
+
+    def build(self, data):
+        if not isinstance(data, dict):
+            raise ValueError('Строка должна быть JSON-объектом')
+        author_id = self.authors.get(data.get('author'))
+        if author_id is None:
+            raise ValueError(f'Нет автора {data.get("author")!r}')
+        now = timezone.now()
+        if self.model is Post:
+            obj = Post(
+                text=data.get('text', ''),
+                pub_date=data.get('pub_date') or now,
+                updated=data.get('updated') or data.get('pub_date') or now,
+                author_id=author_id,
+                group_id=self.group_id(data.get('group')),
+                image=data.get('image') or '',
+            )
+            exclude = ('author', 'group')
+        else:
+            obj = Comment(
+                post_id=data.get('post'),
+                text=data.get('text', ''),
+                created=data.get('created') or now,
+                author_id=author_id,
+            )
+            exclude = ('author', 'post')
+        if data.get('id') is not None:
+            obj.pk = data['id']
+            self.explicit_ids = True
+        obj.clean_fields(exclude=exclude)
+        for field in ('pub_date', 'updated', 'created'):
+            value = getattr(obj, field, None)
+            if value is not None and timezone.is_naive(value):
+                setattr(obj, field, timezone.make_aware(value))
+        return obj
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise ValueError(f'Нет группы {slug!r}')
+        return self.groups[slug]
+
+    def drop_orphans(self, rows):
+        """Отбрасывает комментарии к несуществующим постам."""
+        existing = set(Post.objects.filter(
+            pk__in={obj.post_id for _, obj in rows}
+        ).values_list('pk', flat=True))
+        kept = []
+        for number, obj in rows:
+            if obj.post_id in existing:
+                kept.append((number, obj))
+            else:
+                self.errors.append((number, f'Нет поста {obj.post_id!r}'))
+        return kept
+
+    def new_objects(self, objs):
+        """Отбрасывает строки, которые уже есть в базе или в порции."""
+        ids = [obj.pk for obj in objs if obj.pk is not None]
+        seen_ids = set(self.model.objects.filter(
+            pk__in=ids).values_list('pk', flat=True))
+        key_fields = NATURAL_KEYS[self.model]
+        keyless = [obj for obj in objs if obj.pk is None]
+        seen_keys = set()
+        if keyless:
+            # первые два поля ключа сужают выборку до кандидатов
+            seen_keys = set(self.model.objects.filter(**{
+                f'{field}__in': {getattr(obj, field) for obj in keyless}
+                for field in key_fields[:2]
+            }).values_list(*key_fields))
+        new = []
+        for obj in objs:
+            if obj.pk is not None:
+                if obj.pk in seen_ids:
+                    continue
+                seen_ids.add(obj.pk)
+            else:
+                key = tuple(getattr(obj, field) for field in key_fields)
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+            new.append(obj)
+        return new
+
+    def insert(self, objs):
+        # Django 2.2 не урезает заданный batch_size до лимита параметров
+        # запроса базы (999 у SQLite), поэтому урезаем сами
+        batch_size = min(self.batch_size, connection.ops.bulk_batch_size(
+            self.model._meta.concrete_fields, objs) or self.batch_size)
+        with transaction.atomic():
+            created = []
+            for start in range(0, len(objs), batch_size):
+                created += self.new_objects(objs[start:start + batch_size])
+            # конфликт возможен, только если id занят параллельной записью
+            insert_with_dates(
+                self.model, created, batch_size, ignore_conflicts=True)
+            if self.model is Comment:
+                post_ids = {obj.post_id for obj in created}
+                transaction.on_commit(lambda: _bump_comments(post_ids))
+            transaction.on_commit(bump_feed_version)
+        self.imported += len(created)
+
+    def finish(self):
+        """Досчитывает то, что при save() делают сигналы."""
+        if self.explicit_ids:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [self.model]):
+                    cursor.execute(sql)
+        if self.model is Post:
+            rebuild_index(Post.objects.filter(search_tokens__isnull=True))
+            rebuild_timelines(
+                User.objects.filter(follower__isnull=False).distinct())
+        with transaction.atomic():
+            Profile.objects.rebuild_all()
+
+
+def _bump_comments(post_ids):
+    for post_id in post_ids:
+        bump_comments_version(post_id)
+
+
+def _message(error):
+    if isinstance(error, ValidationError):
+        return '; '.join(
+            f'{field}: {" ".join(messages)}'
+            for field, messages in error.message_dict.items()
+        )
+    return str(error)
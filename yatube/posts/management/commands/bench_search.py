@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.search import search_posts
+from posts.views import POSTS_AMOUNT
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время первой страницы поиска через обратный индекс '
+        'и через LIKE по тексту постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', type=int, default=20,
+            help='Сколько случайных слов из постов искать.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Сколько раз повторять каждый запрос.',
+        )
+
+    def handle(self, *args, queries, repeat, **options):
+        words = self.sample_words(queries)
+        if not words:
+            raise CommandError('Нет постов для поиска')
+        posts = Post.objects.for_feed()
+        paths = {
+            'индекс': lambda word: search_posts(posts, word),
+            'LIKE': lambda word: posts.filter(text__icontains=word),
+        }
+        for name, search in paths.items():
+            elapsed = self.measure(search, words, repeat)
+            self.stdout.write(
+                f'{name}: {elapsed * 1000:.2f} мс на запрос')
+
+    def sample_words(self, count):
+        last = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        if not last:
+            return []
+        words = []
+        for _ in range(count * 3):
+            text = Post.objects.filter(
+                pk__gte=random.randint(1, last[0])
+            ).values_list('text', flat=True).order_by('pk').first()
+            candidates = [word for word in (text or '').split()
+                          if len(word) > 3]
+            if candidates:
+                words.append(random.choice(candidates).strip('.,!?'))
+            if len(words) == count:
+                break
+        return words
+
+    def measure(self, search, words, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for word in words:
+                list(search(word)[:POSTS_AMOUNT + 1])
+        return (time.perf_counter() - started) / (repeat * len(words))
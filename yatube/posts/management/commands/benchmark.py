@@ -0,0 +1,182 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.benchmark import seed as seeding
+from posts.benchmark.runner import (
+    SCENARIOS, ClientTransport, Targets, WSGITransport, compare,
+    run_scenario,
+)
+
+TRANSPORTS = ('client', 'wsgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу данными замеров и меряет задержки p50/p95/p99, '
+        'пропускную способность и число SQL-запросов страниц постов. '
+        'Результат — JSON для сравнения между коммитами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=seeding.SCALES, default='small',
+            help='Объём данных, если база ещё не наполнена.',
+        )
+        parser.add_argument(
+            '--random-seed', type=int, default=0,
+            help='Зерно генератора данных и выбора адресов.',
+        )
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Удалить прежние данные замеров и наполнить заново.',
+        )
+        parser.add_argument(
+            '--allow-write', action='store_true',
+            help='Разрешить запуск без DEBUG: данные замеров, посты и '
+                 'комментарии сценариев останутся в базе.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Сколько запросов на сценарий.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Сколько запросов сценария сделать до замера.',
+        )
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help='Сценарии через запятую.',
+        )
+        parser.add_argument(
+            '--transport', choices=TRANSPORTS + ('all',), default='all',
+            help='Тестовый клиент, локальный WSGI-сервер или оба.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Параллельных запросов к WSGI-серверу.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для JSON; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона: сравнить p95 и упасть, '
+                 'если стало хуже больше --tolerance процентов.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=10,
+            help='Допустимый рост p95 в процентах.',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(unknown)}')
+        # наполнение и сценарии post_create, add_comment пишут в базу,
+        # поэтому без DEBUG запуск нужно подтвердить явно
+        if not (settings.DEBUG or options['allow_write']):
+            raise CommandError(
+                'Замер пишет посты и комментарии в базу '
+                f'{connection.settings_dict["NAME"]}; без DEBUG '
+                'запустите с --allow-write')
+        self.prepare_data(options)
+        try:
+            targets = Targets(options['random_seed'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        results = {}
+        for name in self.transports(options['transport']):
+            transport = (ClientTransport(targets) if name == 'client'
+                         else WSGITransport(targets, options['concurrency']))
+            try:
+                results[name] = {
+                    scenario: run_scenario(
+                        transport, targets, scenario, options['requests'],
+                        options['warmup'], options['cold'])
+                    for scenario in scenarios
+                }
+            finally:
+                transport.close()
+        report = {'meta': self.meta(options), 'results': results}
+        self.write(report, options['output'])
+        if options['compare']:
+            self.compare(report, options['compare'], options['tolerance'])
+
+    def prepare_data(self, options):
+        if options['flush']:
+            seeding.flush()
+        if seeding.is_seeded():
+            return
+        started = time.monotonic()
+        created = seeding.seed(options['scale'], options['random_seed'])
+        if options['verbosity']:
+            counts = ', '.join(
+                f'{name}: {count}' for name, count in created.items())
+            self.stderr.write(
+                f'Создано {counts} за {time.monotonic() - started:.1f} с')
+
+    def transports(self, choice):
+        return TRANSPORTS if choice == 'all' else (choice,)
+
+    def meta(self, options):
+        return {
+            'commit': self.commit(),
+            'created': timezone.now().isoformat(),
+            'scale': options['scale'],
+            'random_seed': options['random_seed'],
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'concurrency': options['concurrency'],
+            'cold': options['cold'],
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ('git', 'rev-parse', '--short', 'HEAD'),
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def write(self, report, output):
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if output is None:
+            self.stdout.write(text)
+            return
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+    def compare(self, report, path, tolerance):
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        rows, regressions = compare(report, baseline, tolerance)
+        for row in rows:
+            self.stderr.write(row)
+        if regressions:
+            raise CommandError(
+                f'p95 вырос больше чем на {tolerance:g}%:\n'
+                + '\n'.join(regressions))
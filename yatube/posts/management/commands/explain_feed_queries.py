@@ -0,0 +1,192 @@
+import re
+import time
+from itertools import cycle
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.cache import bump_comments_version, bump_feed_version
+from posts.models import Comment, Group, Post, User
+
+CHECKED_TABLES = ('posts_post', 'posts_comment')
+# ссылки пагинаторов и переключателей порядка ведут на ту же страницу
+QUERY_LINK = re.compile(r'href="\?([^"]+)"')
+
+# строки плана, означающие полный проход или сортировку во временной таблице
+BAD_PLANS = {
+    'sqlite': (
+        re.compile(r'^SCAN (TABLE )?(?P<table>\w+)\b(?! USING)'),
+        re.compile(r'USE TEMP B-TREE FOR (?!DISTINCT)'),
+    ),
+    'postgresql': (
+        re.compile(r'Seq Scan on (?P<table>\w+)'),
+        re.compile(r'^\s*(->\s*)?Sort\b'),
+    ),
+}
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу тестовыми постами и проверяет через EXPLAIN, '
+        'что все запросы лент и страницы поста идут по индексам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Сколько постов добавить перед проверкой, например 1000000.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Сколько постов вставлять за один запрос.',
+        )
+        parser.add_argument(
+            '--allow-write', action='store_true',
+            help='Разрешить --seed без DEBUG: посты останутся в базе.',
+        )
+
+    def handle(self, *args, seed, batch_size, allow_write, **options):
+        if connection.vendor not in BAD_PLANS:
+            raise CommandError(
+                f'EXPLAIN для {connection.vendor} не поддерживается')
+        # тестовые посты попадут в ленты живой базы, поэтому без DEBUG
+        # наполнение нужно подтвердить явно
+        if seed and not (settings.DEBUG or allow_write):
+            raise CommandError(
+                f'--seed добавит {seed} постов в базу '
+                f'{connection.settings_dict["NAME"]}; без DEBUG '
+                'запустите с --allow-write')
+        if seed:
+            self.seed(seed, batch_size)
+        post = Post.objects.exclude(group=None).order_by('-pk').first()
+        if post is None:
+            raise CommandError('Нет постов с группой, запустите с --seed')
+        commented = Post.objects.filter(
+            comments__isnull=False).order_by('-pk').first() or post
+
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(post.group.slug,)),
+            reverse('posts:profile', args=(post.author.username,)),
+            reverse('posts:post_detail', args=(commented.pk,)),
+        ]
+        problems = []
+        for url in urls:
+            for page_url in self.page_urls(url):
+                problems += self.check_url(page_url)
+        if problems:
+            raise CommandError(
+                'Запросы без индекса:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Все запросы идут по индексам'))
+
+    def seed(self, total, batch_size):
+        started = time.monotonic()
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=f'bench_author_{i}') for i in range(100)],
+                ignore_conflicts=True,
+            )
+            Group.objects.bulk_create(
+                [Group(title=f'Группа {i}', slug=f'bench-group-{i}',
+                       description='Группа для нагрузочной проверки')
+                 for i in range(20)],
+                ignore_conflicts=True,
+            )
+            authors = cycle(User.objects.filter(
+                username__startswith='bench_author_'
+            ).values_list('pk', flat=True))
+            groups = cycle(list(Group.objects.filter(
+                slug__startswith='bench-group-'
+            ).values_list('pk', flat=True)) + [None])
+            for offset in range(0, total, batch_size):
+                Post.objects.bulk_create(
+                    Post(text=f'Пост {number}', author_id=next(authors),
+                         group_id=next(groups))
+                    for number in range(
+                        offset, min(offset + batch_size, total))
+                )
+            Comment.objects.bulk_create(
+                Comment(post_id=post_id, author_id=next(authors),
+                        text='Комментарий')
+                for post_id in Post.objects.values_list(
+                    'pk', flat=True)[:200]
+                for _ in range(25)
+            )
+        call_command('rebuild_post_counters', verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'Добавлено постов: {total} '
+            f'за {time.monotonic() - started:.1f} с')
+
+    def page_urls(self, url):
+        """Первая страница, ссылки с неё и со страниц по этим ссылкам
+        (курсоры вперёд, назад, последняя, порядок) и номерная."""
+        queries = {}
+        for page_url in (url, *(f'{url}?{q}' for q in self.links(url))):
+            queries.update(dict.fromkeys(self.links(page_url)))
+        yield url
+        for query in queries:
+            yield f'{url}?{query}'
+        if queries:
+            yield f'{url}?page=3'
+
+    def links(self, url):
+        response, _ = self.request(url)
+        return QUERY_LINK.findall(response.content.decode())
+
+    def request(self, url):
+        request = RequestFactory(SERVER_NAME='localhost').get(url)
+        request.user = AnonymousUser()
+        match = resolve(request.path_info)
+        # свежие версии, чтобы страница и комментарии не пришли из кеша
+        bump_feed_version()
+        if 'post_id' in match.kwargs:
+            bump_comments_version(match.kwargs['post_id'])
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        started = time.monotonic()
+        with connection.execute_wrapper(capture):
+            response = match.func(request, *match.args, **match.kwargs)
+        return response, (queries, time.monotonic() - started)
+
+    def check_url(self, url):
+        response, (queries, elapsed) = self.request(url)
+        problems = []
+        for sql, params in queries:
+            if not any(f'"{table}"' in sql for table in CHECKED_TABLES):
+                continue
+            for line in self.explain(sql, params):
+                if self.is_bad(line):
+                    problems.append(f'{url}: {line}\n    {sql}')
+        self.stdout.write(
+            f'{url}: {len(queries)} запросов, {elapsed * 1000:.1f} мс')
+        return problems
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN_PREFIX[connection.vendor] + sql, params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def is_bad(self, line):
+        for pattern in BAD_PLANS[connection.vendor]:
+            match = pattern.search(line)
+            if match is None:
+                continue
+            table = match.groupdict().get('table')
+            if table is None or table in CHECKED_TABLES:
+                return True
+        return False
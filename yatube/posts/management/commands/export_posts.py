@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (
+    CHUNK_SIZE, EXPORTS, FORMATS, export_lines, parse_since,
+)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии в NDJSON или CSV потоком.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=EXPORTS, default='posts',
+            help='Что выгружать.',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+            help='Формат файла.',
+        )
+        parser.add_argument(
+            '--since',
+            help='Только изменённые после этого момента, ISO 8601.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+
+    def handle(self, *args, model, format, since, chunk_size, output,
+               **options):
+        if since is not None:
+            try:
+                since = parse_since(since)
+            except ValueError as error:
+                raise CommandError(error)
+        lines = export_lines(model, format, since, chunk_size)
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(output, 'w', encoding='utf-8', newline='') as file:
+            file.writelines(lines)
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(f'Выгружено в {output}'))
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import process_jobs
+from posts.models import Post
+from posts.thumbnails import generate_thumbnail, thumbnail_key
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Строит недостающие миниатюры картинок постов '
+            'и разбирает очередь миниатюр.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков генерации; 0 — в текущем потоке.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить и уже готовые миниатюры.',
+        )
+        parser.add_argument(
+            '--queue-only', action='store_true',
+            help='Только разобрать очередь, без обхода всех постов.',
+        )
+
+    def handle(self, *args, workers, force, queue_only, **options):
+        generated = 0
+        if not queue_only:
+            executor = ThreadPoolExecutor(workers) if workers else None
+            for chunk in self._image_chunks():
+                if not force:
+                    ready = cache.get_many(
+                        [thumbnail_key(name) for name in chunk])
+                    chunk = [name for name in chunk
+                             if thumbnail_key(name) not in ready]
+                if executor:
+                    results = executor.map(self._generate_in_thread, chunk)
+                else:
+                    results = map(generate_thumbnail, chunk)
+                generated += sum(1 for url in results if url is not None)
+            if executor:
+                executor.shutdown()
+        queued = process_jobs(names=[generate_thumbnail.name])
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Построено миниатюр: {generated}, из очереди: {queued}'))
+
+    def _generate_in_thread(self, image_name):
+        try:
+            return generate_thumbnail(image_name)
+        finally:
+            close_old_connections()
+
+    def _image_chunks(self):
+        # keyset по pk: не держим открытый курсор, пока потоки пишут в БД
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.exclude(image='').filter(pk__gt=last_pk)
+                .order_by('pk').values_list('pk', 'image')[:CHUNK_SIZE]
+            )
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            yield list({image for _, image in rows})
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import BATCH_SIZE, COMMIT_EVERY, Importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты или комментарии из NDJSON пачками. '
+        'После обрыва продолжает с последней закоммиченной строки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл NDJSON или «-» для stdin.',
+        )
+        parser.add_argument(
+            '--model', choices=('posts', 'comments'), default='posts',
+            help='Что импортировать.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк вставлять одним INSERT.',
+        )
+        parser.add_argument(
+            '--commit-every', type=int, default=COMMIT_EVERY,
+            help='Сколько строк коммитить одной транзакцией.',
+        )
+        parser.add_argument(
+            '--state',
+            help='Файл с номером последней импортированной строки; '
+                 'по умолчанию <path>.state.',
+        )
+
+    def handle(self, *args, path, model, batch_size, commit_every, state,
+               **options):
+        if state is None and path != '-':
+            state = f'{path}.state'
+        start = self.read_state(state)
+        importer = Importer(model, batch_size, commit_every)
+        self.started = time.monotonic()
+        if start and options['verbosity']:
+            self.stdout.write(f'Продолжаем со строки {start + 1}')
+
+        def on_commit(line_number):
+            self.save_state(state, line_number)
+            if options['verbosity']:
+                self.report(importer, line_number)
+
+        try:
+            if path == '-':
+                importer.run(sys.stdin, start, on_commit)
+            else:
+                with open(path, encoding='utf-8') as file:
+                    importer.run(file, start, on_commit)
+        except OSError as error:
+            raise CommandError(error)
+        importer.finish()
+
+        for number, message in importer.errors:
+            self.stderr.write(f'Строка {number}: {message}')
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Импортировано: {importer.imported}, '
+                f'с ошибками: {len(importer.errors)}, '
+                f'{time.monotonic() - self.started:.1f} с'))
+
+    def read_state(self, state):
+        if state is None or not os.path.exists(state):
+            return 0
+        with open(state) as file:
+            try:
+                return int(file.read().strip() or 0)
+            except ValueError:
+                raise CommandError(f'Испорчен файл состояния {state}')
+
+    def save_state(self, state, line_number):
+        if state is not None:
+            with open(state, 'w') as file:
+                file.write(str(line_number))
+
+    def report(self, importer, line_number):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(
+            f'Строка {line_number}: импортировано {importer.imported}, '
+            f'{importer.imported / elapsed:.0f} строк/с')
@@ -0,0 +1,83 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.images import ingest_file, is_ingested, replace_image
+from posts.models import Post
+from posts.thumbnails import enqueue_thumbnail
+
+CHUNK_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает картинки, загруженные до появления обработки: '
+            'уменьшает, чистит метаданные и кладёт под именем из хеша.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов декодирования; 0 — в текущем процессе.',
+        )
+
+    def handle(self, *args, workers, **options):
+        executor = None
+        if workers:
+            # fork наследует настроенный Django
+            executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('fork'))
+        processed = failed = before = after = 0
+        try:
+            for chunk in self._pending_chunks():
+                if executor:
+                    # процессы форкаются при первом submit, а выборка
+                    # чанка уже открыла подключение к базе: дочерним
+                    # процессам оно не нужно, закрываем до fork
+                    connections.close_all()
+                    futures = [executor.submit(ingest_file, name)
+                               for name in chunk]
+                    results = [_outcome(future.result) for future in futures]
+                else:
+                    results = [_outcome(ingest_file, name) for name in chunk]
+                for name, result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        failed += 1
+                        self.stderr.write(f'{name}: {result}')
+                        continue
+                    new_name, size, new_size = result
+                    replace_image(name, new_name)
+                    enqueue_thumbnail(new_name)
+                    processed += 1
+                    before += size
+                    after += new_size
+        finally:
+            if executor:
+                executor.shutdown()
+        if options['verbosity']:
+            saved = (before - after) / 2 ** 20
+            self.stdout.write(self.style.SUCCESS(
+                f'Обработано картинок: {processed}, ошибок: {failed}, '
+                f'сэкономлено {saved:.1f} МБ из {before / 2 ** 20:.1f} МБ'))
+
+    def _pending_chunks(self):
+        # замена картинки меняет строки, поэтому идём keyset по pk
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.exclude(image='').filter(pk__gt=last_pk)
+                .order_by('pk').values_list('pk', 'image')[:CHUNK_SIZE]
+            )
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            names = {image for _, image in rows if not is_ingested(image)}
+            if names:
+                yield sorted(names)
+
+
+def _outcome(func, *args):
+    try:
+        return func(*args)
+    except Exception as error:
+        return error
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев в профилях авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько профилей записывать за один запрос.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        with transaction.atomic():
+            total = Profile.objects.rebuild_all(batch_size=batch_size)
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Пересчитано профилей: {total}'))
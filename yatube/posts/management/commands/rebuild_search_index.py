@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за одну транзакцию.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        total = rebuild_index(Post.objects.all(), batch_size=batch_size)
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Проиндексировано постов: {total}'))
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild_timelines, trim_timelines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Заново раскладывает ленты подписок по таблице подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Чьи ленты перестроить; по умолчанию всех пользователей.',
+        )
+        parser.add_argument(
+            '--trim', action='store_true',
+            help='Только срезать ленты до TIMELINE_LENGTH постов.',
+        )
+
+    def handle(self, *args, usernames, trim, **options):
+        if trim:
+            deleted = trim_timelines()
+            if options['verbosity']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Удалено записей лент: {deleted}'))
+            return
+        users = User.objects.all()
+        if usernames:
+            users = users.filter(username__in=usernames)
+        total = rebuild_timelines(users)
+        if options['verbosity']:
+            self.stdout.write(
+                self.style.SUCCESS(f'Перестроено лент: {total}'))
@@ -0,0 +1,171 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:07
+
+import re
+from functools import lru_cache
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Замороженная копия токенизатора posts.search на момент миграции: правки
+# стеммера не должны менять то, что делает уже написанная миграция.
+TOKEN_MAX_LENGTH = 64
+WORD = re.compile(r'[0-9a-zа-я]+')
+VOWELS = 'аеиоуыэюя'
+
+STOP_WORDS = frozenset('''
+    а без более бы был была были было быть в вам вас ведь во вот все всех
+    всего всю вы где да для до его ее ей если есть еще же за здесь и из
+    или им их к как какой когда кто ли между меня мне мой мы на над надо
+    нас не него нее нет ни них но ну о об он она они от по под после при
+    про с со так также там тем то того тоже только том тот ту тут у уже
+    чем что чтобы эта эти это этот я
+    a an and are as at be by for from in is it of on or that the to with
+'''.split())
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _strip(word, start, endings, after_a=False):
+    """Отрезает самое длинное окончание, не заходящее левее start.
+
+    after_a — окончания первой группы Snowball: перед ними должна
+    стоять «а» или «я», которая сама остаётся в основе.
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        cut = len(word) - len(ending)
+        if not word.endswith(ending) or cut < start:
+            continue
+        if after_a and (cut - 1 < start or word[cut - 1] not in 'ая'):
+            continue
+        return word[:cut]
+    return None
+
+
+def _strip_grouped(word, start, groups):
+    first, second = groups
+    return (_strip(word, start, first, after_a=True)
+            or _strip(word, start, second))
+
+
+def _regions(word):
+    """Начала областей RV и R2 из описания стеммера Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, char in enumerate(word):
+        if char in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    if not re.fullmatch('[а-я]+', word):
+        return word
+    rv, r2 = _regions(word)
+
+    stripped = _strip_grouped(word, rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stripped = _strip(word, rv, ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip_grouped(stripped, rv, PARTICIPLE) or stripped
+        else:
+            stripped = (_strip_grouped(word, rv, VERB)
+                        or _strip(word, rv, NOUN))
+    word = stripped or word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        return word[:-1] if word.endswith('нн') else word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Уникальные основы слов текста в порядке появления."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return list(dict.fromkeys(
+        stem(word)[:TOKEN_MAX_LENGTH]
+        for word in words if word not in STOP_WORDS
+    ))
+
+
+def index_existing_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchToken = apps.get_model('posts', 'SearchToken')
+    SearchToken.objects.bulk_create(
+        (SearchToken(token=token, post_id=pk)
+         for pk, text in Post.objects.values_list('pk', 'text').iterator()
+         for token in tokenize(text)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Токен поиска',
+                'verbose_name_plural': 'Токены поиска',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchtoken',
+            constraint=models.UniqueConstraint(fields=('token', 'post'), name='search_token_post_uniq'),
+        ),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ThumbnailJob',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_delete_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/incoming/', verbose_name='Картинка'),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
+from core.storage import media_storage
+
 User = get_user_model()
 
 
@@ -13,6 +17,22 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN, без лишних колонок."""
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'updated',
+            'image',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+            'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст",
@@ -23,6 +43,11 @@ class Post(models.Model):
         verbose_name="Дата публикации",
         help_text="Дата публикации поста",
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+        help_text="Дата последнего изменения поста",
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,14 +64,26 @@ class Post(models.Model):
         verbose_name="Группа",
         help_text="Группа, к которой будет относиться пост",
     )
+    # загрузка ждёт обработки в posts/incoming/, результат — в posts/
     image = models.ImageField(
         verbose_name='Картинка',
-        upload_to='posts/',
+        upload_to='posts/incoming/',
+        storage=media_storage,
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        # порядок совпадает с ключом курсорной пагинации (-pub_date, -pk)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'), name='post_feed_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_feed_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -81,5 +118,206 @@ class Comment(models.Model):
         help_text="Дата публикации комментария",
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('post', 'created'),
+                         name='comment_thread_idx'),
+        )
+
     def __str__(self):
         return self.text[:15]
+
+
+def _count_by_user(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(total=Count('pk')).values('total'),
+        output_field=models.IntegerField(),
+    ), 0)
+
+
+class ProfileQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Профиль автора; отсутствующий создаётся с пересчётом."""
+        try:
+            return user.profile
+        except Profile.DoesNotExist:
+            return self.rebuild(user.pk)
+
+    def rebuild(self, user_id):
+        """Пересчитывает счётчики автора по таблицам постов и комментариев."""
+        # счётчики пишутся в основную базу, по ней и считаем: отставшая
+        # реплика закрепила бы неверные числа
+        counters = {
+            'posts_count': Post.objects.using(DEFAULT_DB_ALIAS).filter(
+                author_id=user_id).count(),
+            'comments_count': Comment.objects.using(DEFAULT_DB_ALIAS).filter(
+                author_id=user_id).count(),
+            'followers_count': Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+                author_id=user_id).count(),
+        }
+        profile, _ = self.update_or_create(
+            user_id=user_id, defaults=counters)
+        return profile
+
+    def add_to_counter(self, user_id, field, delta):
+        """Атомарно сдвигает счётчик; вызывать внутри транзакции записи."""
+        updated = self.filter(user_id=user_id).update(
+            **{field: models.F(field) + delta})
+        if not updated and delta > 0:
+            self.rebuild(user_id)
+
+    def rebuild_all(self, batch_size=1000):
+        """Пересчитывает счётчики всех пользователей пачками."""
+        # подзапрос на каждый счётчик: JOIN всех трёх таблиц сразу
+        # перемножает строки и на больших таблицах считается минутами
+        users = User.objects.annotate(
+            posts_total=_count_by_user(Post, 'author'),
+            comments_total=_count_by_user(Comment, 'author'),
+            followers_total=_count_by_user(Follow, 'author'),
+        ).values_list('pk', 'posts_total', 'comments_total', 'followers_total')
+        existing = dict(self.values_list('user_id', 'pk'))
+        to_create, to_update = [], []
+        total = 0
+        for user_id, posts, comments, followers in users.iterator():
+            profile = Profile(
+                pk=existing.get(user_id),
+                user_id=user_id,
+                posts_count=posts,
+                comments_count=comments,
+                followers_count=followers,
+            )
+            if profile.pk is None:
+                to_create.append(profile)
+            else:
+                to_update.append(profile)
+            total += 1
+            if len(to_create) + len(to_update) >= batch_size:
+                self._flush(to_create, to_update)
+        self._flush(to_create, to_update)
+        return total
+
+    def _flush(self, to_create, to_update):
+        self.bulk_create(to_create)
+        self.bulk_update(
+            to_update, ['posts_count', 'comments_count', 'followers_count'])
+        to_create.clear()
+        to_update.clear()
+
+
+class Profile(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число постов",
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число комментариев",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число подписчиков",
+    )
+
+    objects = ProfileQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Профиль автора'
+        verbose_name_plural = 'Профили авторов'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class SearchToken(models.Model):
+    """Запись обратного индекса: основа слова встречается в посте."""
+    token = models.CharField(
+        max_length=64,
+        verbose_name="Основа слова",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+        verbose_name="Пост",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('token', 'post'), name='search_token_post_uniq'),
+        )
+        verbose_name = 'Токен поиска'
+        verbose_name_plural = 'Токены поиска'
+
+    def __str__(self):
+        return self.token
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="follower",
+        verbose_name="Подписчик",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="following",
+        verbose_name="Автор",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='follow_user_author_uniq'),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self'),
+        )
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self):
+        return f'{self.user} → {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в готовой ленте подписчика, разложенный при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Читатель",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации поста",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='timeline_user_post_uniq'),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_feed_idx'),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
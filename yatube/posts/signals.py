@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import StoredFile
+from .cache import (
+    bump_comments_version, bump_feed_version, bump_personal_version,
+    comments_version_key, invalidate_post_cards, post_card_key,
+)
+from .models import Comment, Follow, Group, Post, Profile
+from .search import index_post
+from .timeline import enqueue_fan_out, follower_removed
+
+User = get_user_model()
+
+COUNTERS = {
+    Post: 'posts_count',
+    Comment: 'comments_count',
+}
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Comment)
+def remember_loaded_state(sender, instance, **kwargs):
+    # поля могут быть отложены через only(): не догружаем их
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+    instance._loaded_updated = instance.__dict__.get('updated')
+    instance._loaded_text = instance.__dict__.get('text')
+    if sender is Post:
+        instance._loaded_image = _image_name(instance.__dict__.get('image'))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def count_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    field = COUNTERS[sender]
+    previous_author_id = instance._loaded_author_id
+    if created:
+        Profile.objects.add_to_counter(instance.author_id, field, 1)
+    elif (previous_author_id is not None
+          and previous_author_id != instance.author_id):
+        Profile.objects.add_to_counter(previous_author_id, field, -1)
+        Profile.objects.add_to_counter(instance.author_id, field, 1)
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def count_deleted(sender, instance, **kwargs):
+    Profile.objects.add_to_counter(
+        instance.author_id, COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, **kwargs):
+    if instance._loaded_updated is not None:
+        cache.delete(post_card_key(instance.pk, instance._loaded_updated))
+    instance._loaded_updated = instance.updated
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, created, raw, **kwargs):
+    # токены удаляются вместе с постом каскадом
+    if raw or (not created and instance.text == instance._loaded_text):
+        return
+    index_post(instance)
+    instance._loaded_text = instance.text
+
+
+@receiver(post_save, sender=Post)
+def fan_out_created_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        enqueue_fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Profile.objects.add_to_counter(
+            instance.author_id, 'followers_count', 1)
+        # кнопка подписки — личная вставка подписчика
+        bump_personal_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    Profile.objects.add_to_counter(instance.author_id, 'followers_count', -1)
+    bump_personal_version(instance.user_id)
+    follower_removed(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    if instance.__dict__.get('updated') is not None:
+        cache.delete(post_card_key(instance.pk, instance.updated))
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    bump_comments_version(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_posts(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_post_cards(Post.objects.filter(group=instance))
+    # новая группа должна появиться в списке групп API
+    bump_feed_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_posts(sender, instance, created, update_fields,
+                            **kwargs):
+    # вход пользователя обновляет только last_login: карточки не меняются
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_post_cards(Post.objects.filter(author=instance))
+    bump_feed_version()
+    # имя в шапке
+    bump_personal_version(instance.pk)
+    # имя автора показано и в блоках комментариев, которые он оставил
+    cache.delete_many([
+        comments_version_key(post_id)
+        for post_id in Comment.objects.filter(
+            author=instance).values_list('post_id', flat=True).distinct()
+    ])
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    image = _image_name(instance.image)
+    if created:
+        StoredFile.objects.add_reference(image, 1)
+    elif (instance._loaded_image is not None
+          and instance._loaded_image != image):
+        StoredFile.objects.add_reference(instance._loaded_image, -1)
+        StoredFile.objects.add_reference(image, 1)
+    instance._loaded_image = image
+
+
+@receiver(post_delete, sender=Post)
+def release_image_reference(sender, instance, **kwargs):
+    StoredFile.objects.add_reference(
+        _image_name(instance.__dict__.get('image')), -1)
+
+
+def _image_name(value):
+    return getattr(value, 'name', value)
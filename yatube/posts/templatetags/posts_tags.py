@@ -0,0 +1,61 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.cache import PERSONAL_MARKER, post_card_key
+from posts.models import Follow
+from posts.thumbnails import attach_thumbnail_urls, thumbnail_url
+
+register = template.Library()
+
+POST_CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки страницы: один get_many, рендер только промахов."""
+    keys = [(post_card_key(post.pk, post.updated), post) for post in posts]
+    cards = cache.get_many([key for key, _ in keys])
+    missing = [(key, post) for key, post in keys if key not in cards]
+    # миниатюры промахов тоже одним запросом, а не по одному в шаблоне
+    attach_thumbnail_urls(post for _, post in missing)
+    rendered = {
+        key: render_to_string(POST_CARD_TEMPLATE, {'post': post})
+        for key, post in missing
+    }
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key, _ in keys]
+
+
+@register.simple_tag
+def post_image_url(post):
+    url = getattr(post, 'thumbnail_url', None)
+    return url if url is not None else thumbnail_url(post.image)
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, template_name, **kwargs):
+    """Вставка, своя у каждого пользователя: шапка, кнопка подписки.
+
+    В общем теле кешированной ленты на её месте остаётся метка, которую
+    cache_feed_page заполняет при ответе; шаблон вставки видит только
+    kwargs и контекст запроса. На остальных страницах просто include.
+    """
+    fragments = getattr(context.get('request'), 'personal_fragments', None)
+    if fragments is None:
+        fragment = context.template.engine.get_template(template_name)
+        with context.push(**kwargs):
+            return mark_safe(fragment.render(context))
+    fragments.append((template_name, kwargs))
+    return mark_safe(PERSONAL_MARKER.format(len(fragments) - 1))
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, username):
+    user = context['user']
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author__username=username).exists()
@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from posts.benchmark import seed
+from posts.benchmark.runner import compare, percentile
+from posts.models import Comment, Post, Profile
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_INLINE_WORKERS=0)
+class BenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_is_deterministic(self):
+        """Данные замеров повторяются при том же зерне"""
+        seed.seed('tiny', random_seed=1)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'pub_date'))
+        seed.flush()
+        self.assertFalse(seed.is_seeded())
+        seed.seed('tiny', random_seed=1)
+        self.assertEqual(list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'pub_date')), first)
+        self.assertEqual(len(first), seed.SCALES['tiny']['posts'])
+        self.assertEqual(
+            Comment.objects.count(), seed.SCALES['tiny']['comments'])
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            sum(Profile.objects.values_list('posts_count', flat=True)),
+            len(first))
+
+    def test_command_reports_json(self):
+        """Команда отдаёт JSON и падает при росте p95"""
+        out = io.StringIO()
+        call_command(
+            'benchmark', scale='tiny', requests=3, warmup=1,
+            transport='client', allow_write=True, stdout=out,
+            stderr=io.StringIO())
+        report = json.loads(out.getvalue())
+        results = report['results']['client']
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'post_create', 'add_comment',
+        })
+        for scenario, stats in results.items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(stats['requests'], 3)
+                self.assertEqual(stats['errors'], 0)
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                self.assertIsNotNone(stats['queries_mean'])
+        self.assertEqual(report['meta']['scale'], 'tiny')
+
+        baseline = os.path.join(TEMP_MEDIA_ROOT, 'baseline.json')
+        for stats in results.values():
+            stats['p95_ms'] = stats['p95_ms'] / 10
+        with open(baseline, 'w') as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, 'p95 вырос'):
+            call_command(
+                'benchmark', requests=1, warmup=0, transport='client',
+                scenarios='index', compare=baseline, allow_write=True,
+                stdout=io.StringIO(), stderr=io.StringIO())
+
+    @override_settings(DEBUG=False)
+    def test_needs_confirmation(self):
+        """Без DEBUG и --allow-write замер не запускается"""
+        with self.assertRaisesMessage(CommandError, '--allow-write'):
+            call_command('benchmark', scale='tiny', stdout=io.StringIO(),
+                         stderr=io.StringIO())
+        self.assertFalse(seed.is_seeded())
+
+    def test_percentile_and_compare(self):
+        """Перцентили и сравнение с прошлым прогоном"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+        current = {'results': {'client': {'index': {
+            'p95_ms': 12, 'queries_mean': 1}}}}
+        baseline = {'results': {'client': {'index': {
+            'p95_ms': 10, 'queries_mean': 1}}}}
+        rows, regressions = compare(current, baseline, tolerance=25)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(regressions, [])
+        _, regressions = compare(current, baseline, tolerance=10)
+        self.assertEqual(len(regressions), 1)
@@ -0,0 +1,285 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cache import post_card_key
+from posts.models import Comment, Group, Post
+from posts.views import COMMENTS_AMOUNT
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Старый текст', author=self.author, group=self.group)
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+
+    def get_pages(self):
+        return [self.guest_client.get(url).content.decode()
+                for url in self.urls]
+
+    def card_is_cached(self):
+        post = Post.objects.get(pk=self.post.pk)
+        return cache.get(post_card_key(post.pk, post.updated)) is not None
+
+    def test_cards_are_cached(self):
+        """Лента кладёт карточки постов в кеш"""
+        self.get_pages()
+        self.assertTrue(self.card_is_cached())
+
+    def test_post_edit_is_visible_immediately(self):
+        """Правка поста сразу видна во всех лентах"""
+        self.get_pages()
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk},
+        )
+        for content in self.get_pages():
+            with self.subTest(content=content[:50]):
+                self.assertIn('Новый текст', content)
+                self.assertNotIn('Старый текст', content)
+
+    def test_author_rename_invalidates_cards(self):
+        """Смена имени автора сбрасывает его карточки"""
+        self.get_pages()
+        self.author.last_name = 'Достоевский'
+        self.author.save()
+        self.assertFalse(self.card_is_cached())
+        for content in self.get_pages():
+            with self.subTest(content=content[:50]):
+                self.assertIn('Достоевский', content)
+
+    def test_group_change_invalidates_cards(self):
+        """Смена slug группы сбрасывает карточки её постов"""
+        self.get_pages()
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertFalse(self.card_is_cached())
+        content = self.guest_client.get(reverse('posts:index')).content
+        self.assertIn(b'/group/renamed/', content)
+
+    def test_login_keeps_cards(self):
+        """Вход автора не сбрасывает его карточки"""
+        self.author.set_password('secret')
+        self.author.save()
+        self.get_pages()
+        self.assertTrue(
+            Client().login(username='author', password='secret'))
+        self.assertTrue(self.card_is_cached())
+
+
+class CommentsBlockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        for index in range(COMMENTS_AMOUNT + 5):
+            Comment.objects.create(
+                post=self.post, text=f'Комментарий {index}',
+                author=User.objects.create_user(username=f'reader{index}'),
+            )
+        call_command('rebuild_post_counters', verbosity=0)
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+
+    def test_comments_are_paginated(self):
+        """Комментарии разбиты на страницы, порядок переключается"""
+        comments = self.client.get(self.url).context['comments']
+        self.assertEqual(len(comments), COMMENTS_AMOUNT)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        tail = self.client.get(
+            self.url, {'cursor': comments.next_cursor}).context['comments']
+        self.assertEqual(len(tail), 5)
+        newest = self.client.get(
+            self.url, {'order': 'new'}).context['comments']
+        self.assertEqual(newest[0].text, f'Комментарий {COMMENTS_AMOUNT + 4}')
+
+    def test_comments_block_is_cached(self):
+        """Повторный просмотр не читает комментарии из базы"""
+        guest = Client()
+        with self.assertNumQueries(3):
+            guest.get(self.url)
+        with self.assertNumQueries(2):
+            content = guest.get(self.url).content.decode()
+        self.assertIn('reader0', content)
+
+    def test_garbage_cursor_shares_first_page(self):
+        """Мусорный курсор отдаёт закешированную первую страницу"""
+        guest = Client()
+        guest.get(self.url)
+        with self.assertNumQueries(2):
+            content = guest.get(self.url, {'cursor': 'garbage'}).content
+        self.assertIn('Комментарий 0', content.decode())
+
+    def test_add_comment_invalidates_block(self):
+        """Новый комментарий сразу виден в кешированном блоке"""
+        self.client.get(self.url, {'order': 'new'})
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Свежий комментарий'},
+        )
+        content = self.client.get(self.url, {'order': 'new'}).content
+        self.assertIn('Свежий комментарий', content.decode())
+
+    def test_reader_rename_invalidates_block(self):
+        """Смена имени комментатора сбрасывает блок"""
+        self.client.get(self.url)
+        reader = User.objects.get(username='reader0')
+        reader.username = 'renamed_reader'
+        reader.save()
+        self.assertIn(
+            'renamed_reader', self.client.get(self.url).content.decode())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_unchanged_page_is_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без запросов к БД"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_refresh_etag(self):
+        """Новый пост и комментарий меняют ETag"""
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        Post.objects.create(text='Ещё пост', author=self.author)
+        Comment.objects.create(post=self.post, author=self.author, text='К')
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Страница гостя не подходит авторизованному и наоборот"""
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cache_control(self):
+        """Гостевая страница публичная, страница пользователя приватная"""
+        guest = self.guest_client.get(self.urls[0])['Cache-Control']
+        self.assertIn('public', guest)
+        self.assertIn('max-age=0', guest)
+        self.assertIn('s-maxage=', guest)
+        private = self.author_client.get(self.urls[2])['Cache-Control']
+        self.assertIn('private', private)
+        self.assertNotIn('public', private)
+
+
+class SplitFeedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Пост', author=self.author)
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def test_no_cross_user_leakage(self):
+        """Каждый видит в шапке себя, а не того, кто прогрел кеш"""
+        clients = (
+            (self.author_client, 'Пользователь: author'),
+            (self.reader_client, 'Пользователь: reader'),
+            (self.guest_client, 'Войти'),
+        )
+        for url in self.urls:
+            for _ in range(2):
+                for client, expected in clients:
+                    with self.subTest(url=url, expected=expected):
+                        content = client.get(url).content.decode()
+                        self.assertIn(expected, content)
+                        self.assertEqual(
+                            content.count('Пользователь:'),
+                            0 if client is self.guest_client else 1)
+                        self.assertNotIn('<!--personal:', content)
+
+    def test_logged_in_users_share_feed_body(self):
+        """Тело ленты, прогретое одним пользователем, получает и другой"""
+        url = self.urls[0]
+        self.author_client.get(url)
+        # только сессия и пользователь, ленту не рендерим
+        with self.assertNumQueries(2), self.assertTemplateNotUsed(
+                template_name='posts/index.html'):
+            self.reader_client.get(url)
+        with self.assertNumQueries(2), self.assertTemplateNotUsed(
+                template_name='includes/header.html'):
+            self.reader_client.get(url)
+
+    def test_follow_button_is_personal(self):
+        """Кнопка подписки на профиле своя у каждого и сразу меняется"""
+        url = self.urls[1]
+        follow_url = reverse(
+            'posts:profile_follow', kwargs={'username': 'author'})
+        self.guest_client.get(url)
+        self.assertNotIn(
+            follow_url, self.author_client.get(url).content.decode())
+        self.assertIn(follow_url, self.reader_client.get(url).content.decode())
+        self.reader_client.get(follow_url)
+        content = self.reader_client.get(url).content.decode()
+        self.assertNotIn(follow_url, content)
+        self.assertIn('Отписаться', content)
+        self.assertNotIn(
+            'Отписаться', self.guest_client.get(url).content.decode())
+
+    def test_follow_refreshes_etag(self):
+        """После подписки старый ETag профиля больше не подходит"""
+        url = self.urls[1]
+        etag = self.reader_client.get(url)['ETag']
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}))
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Отписаться', response.content.decode())
+
+    def test_rename_refreshes_header(self):
+        """Новое имя пользователя сразу видно в шапке"""
+        url = self.urls[0]
+        self.reader_client.get(url)
+        self.reader.username = 'renamed_reader'
+        self.reader.save()
+        self.assertIn('Пользователь: renamed_reader',
+                      self.reader_client.get(url).content.decode())
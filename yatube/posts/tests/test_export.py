@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост, с "кавычками"\nи переводом строки',
+            author=cls.author, group=cls.group)
+        cls.other = Post.objects.create(text='Второй', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.author, text='Да')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.staff_client.get(reverse('posts:export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        """Посты выгружаются в NDJSON по порядку pk"""
+        lines = self.export().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.post.pk, self.other.pk])
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertIsNone(rows[1]['group'])
+
+    def test_csv_comments(self):
+        """Комментарии выгружаются в CSV"""
+        rows = list(csv.DictReader(io.StringIO(
+            self.export(model='comments', format='csv'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['post'], str(self.post.pk))
+        self.assertEqual(rows[0]['text'], 'Да')
+
+    def test_since(self):
+        """since отдаёт только изменённое позже"""
+        Post.objects.filter(pk=self.post.pk).update(
+            updated=timezone.now() - timedelta(days=2))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = [json.loads(line)
+                for line in self.export(since=since).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.other.pk])
+        response = self.staff_client.get(
+            reverse('posts:export'), {'since': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_only(self):
+        """Выгрузка доступна только персоналу"""
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        """Команда выгружает посты в CSV частями"""
+        out = io.StringIO()
+        call_command('export_posts', format='csv', chunk_size=1, stdout=out)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0][:2], ['id', 'text'])
+        self.assertEqual(rows[1][1], self.post.text)
+        self.assertEqual(len(rows), 3)
@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.jobs import process_jobs
+from posts.models import Follow, Post, Profile, TimelineEntry
+from posts.views import POSTS_AMOUNT
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=3, JOBS_INLINE_WORKERS=0)
+class FollowTimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.stranger = User.objects.create_user(username='stranger')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_url(self, user, action='profile_follow'):
+        return reverse(f'posts:{action}', kwargs={'username': user.username})
+
+    def feed(self, client=None):
+        response = (client or self.reader_client).get(
+            reverse('posts:follow_index'))
+        return response.context['page_obj']
+
+    def test_follow_and_unfollow(self):
+        """Подписка создаётся один раз, отписка удаляет её и ленту"""
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.reader_client.get(self.follow_url(self.author))
+        self.reader_client.get(self.follow_url(self.author))
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(len(self.feed()), 1)
+        self.reader_client.get(
+            self.follow_url(self.author, 'profile_unfollow'))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(len(self.feed()), 0)
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя"""
+        self.reader_client.get(self.follow_url(self.reader))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_reaches_followers_only(self):
+        """Новый пост попадает в ленту подписчика, но не чужую"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(process_jobs(), 1)
+        self.assertIn(post, self.feed())
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.assertNotIn(post, self.feed(stranger_client))
+
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора не раскладываются, но видны в ленте"""
+        star = User.objects.create_user(username='star')
+        for index in range(3):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'fan{index}'),
+                author=star)
+        Follow.objects.create(user=self.reader, author=star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        for index in range(POSTS_AMOUNT):
+            Post.objects.create(text=f'Звезда {index}', author=star)
+            Post.objects.create(text=f'Автор {index}', author=self.author)
+        process_jobs()
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=star).exists())
+        first = self.feed()
+        self.assertEqual(len(first), POSTS_AMOUNT)
+        second = self.reader_client.get(
+            reverse('posts:follow_index'), {'cursor': first.next_cursor},
+        ).context['page_obj']
+        posts = list(first) + list(second)
+        self.assertEqual(len(posts), 2 * POSTS_AMOUNT)
+        self.assertEqual(
+            posts, sorted(posts, key=lambda post: (post.pub_date, post.pk),
+                          reverse=True))
+        self.assertEqual({post.author for post in posts},
+                         {star, self.author})
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает ленты по подпискам"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', 'reader', verbosity=0)
+        self.assertIn(post, self.feed())
+
+    def test_author_below_limit_is_fanned_out(self):
+        """Посты автора, ставшего непопулярным, остаются в лентах"""
+        star = User.objects.create_user(username='star')
+        fans = [User.objects.create_user(username=f'fan{index}')
+                for index in range(2)]
+        for user in fans + [self.reader]:
+            Follow.objects.create(user=user, author=star)
+        post = Post.objects.create(text='Пост звезды', author=star)
+        process_jobs()
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=fans[0]).delete()
+        Follow.objects.get(user=fans[1]).delete()
+        self.assertEqual(process_jobs(), 1)
+        self.assertIn(post, self.feed())
+        # отписавшимся раскладывать нечего
+        self.assertFalse(TimelineEntry.objects.filter(user=fans[1]).exists())
+
+    def test_timelines_are_trimmed(self):
+        """Лента не хранит больше TIMELINE_LENGTH постов"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'Пост {index}', author=self.author)
+                 for index in range(4)]
+        latest = {posts[-1].pk, posts[-2].pk}
+        with mock.patch('posts.timeline.TIMELINE_LENGTH', 2):
+            process_jobs()
+            self.assertEqual(set(TimelineEntry.objects.values_list(
+                'post_id', flat=True)), latest)
+            call_command('rebuild_timelines', trim=True, verbosity=0)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('post_id', flat=True)),
+            latest)
@@ -1,4 +1,5 @@
 # posts/tests/test_forms.py
+import hashlib
 import shutil
 import tempfile
 from django.test import TestCase, Client, override_settings
@@ -39,6 +40,10 @@ class PostCreateFormTests(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        # хранилище называет файл по SHA-256 содержимого
+        digest = hashlib.sha256(small_gif).hexdigest()
+        cls.img_name = (
+            f'posts/incoming/{digest[:2]}/{digest[2:4]}/{digest}.gif')
 
     @classmethod
     def tearDownClass(cls):
@@ -76,7 +81,7 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
                 author=PostCreateFormTests.author_user,
                 group=form_data['group'],
-                image=f"posts/{form_data['image']}"
+                image=PostCreateFormTests.img_name
             ).exists()
         )
         self.assertTrue(
@@ -85,7 +90,7 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
                 author=PostCreateFormTests.author_user,
                 group=form_data['group'],
-                image=f"posts/{form_data['image']}"
+                image=PostCreateFormTests.img_name
             )
         )
         latest_object = Post.objects.latest('pub_date')
@@ -93,7 +98,7 @@ class PostCreateFormTests(TestCase):
             (
                 latest_object.text == form_data['text']
                 and latest_object.group.pk == form_data['group']
-                and latest_object.image == f"posts/{form_data['image']}")
+                and latest_object.image == PostCreateFormTests.img_name)
         )
 
 
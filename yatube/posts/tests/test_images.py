@@ -0,0 +1,128 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.jobs import process_jobs
+from posts.images import is_ingested, process_image
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+ORIENTATION = 0x0112
+
+
+def make_photo(size=(300, 100), orientation=None, image_format='JPEG'):
+    """Картинка с EXIF-поворотом, как снимок с телефона."""
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, image_format, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=60,
+                   IMAGE_FORMAT='JPEG', JOBS_INLINE_WORKERS=0)
+class ImageIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create_post(self, data, name='photo.jpg'):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile(name, data, 'image/jpeg'),
+        })
+        return Post.objects.latest('pk')
+
+    def test_process_image(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF"""
+        processed = process_image(make_photo(orientation=6))
+        image = Image.open(BytesIO(processed.data))
+        self.assertEqual(processed.extension, 'jpg')
+        self.assertEqual(image.size, (20, 60))
+        self.assertNotIn(ORIENTATION, image.getexif())
+
+    @override_settings(IMAGE_FORMAT='WEBP')
+    def test_webp_keeps_transparency(self):
+        """В WebP прозрачность сохраняется"""
+        image = Image.new('RGBA', (10, 10), (0, 0, 0, 0))
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        processed = process_image(buffer.getvalue())
+        self.assertEqual(processed.extension, 'webp')
+        self.assertEqual(Image.open(BytesIO(processed.data)).mode, 'RGBA')
+
+    def test_animation_loses_metadata(self):
+        """Анимация сохраняет кадры, но теряет комментарий и EXIF"""
+        frames = [Image.new('RGB', (10, 10), color)
+                  for color in ('red', 'blue')]
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        for image_format, metadata in (
+                ('GIF', {'comment': b'secret'}),
+                ('WEBP', {'exif': exif.tobytes()})):
+            with self.subTest(image_format=image_format):
+                buffer = BytesIO()
+                frames[0].save(
+                    buffer, image_format, save_all=True,
+                    append_images=frames[1:], duration=50, **metadata)
+                image = Image.open(BytesIO(process_image(
+                    buffer.getvalue()).data))
+                self.assertTrue(getattr(image, 'is_animated', False))
+                self.assertNotIn('comment', image.info)
+                self.assertNotIn('exif', image.info)
+                self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_upload_is_replaced_by_worker(self):
+        """Воркер заменяет загрузку обработанной картинкой под хешем"""
+        post = self.create_post(make_photo(orientation=6))
+        original = post.image.name
+        self.assertFalse(is_ingested(original))
+        process_jobs()
+        post.refresh_from_db()
+        self.assertTrue(is_ingested(post.image.name))
+        self.assertFalse(default_storage.exists(original))
+        self.assertEqual(Image.open(post.image).size, (20, 60))
+
+    def test_identical_uploads_share_a_file(self):
+        """Одинаковые загрузки хранятся одним файлом"""
+        data = make_photo()
+        first = self.create_post(data, 'first.jpg')
+        second = self.create_post(data, 'second.jpg')
+        process_jobs()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_backfill_command(self):
+        """Команда обрабатывает картинки, загруженные раньше"""
+        post = Post.objects.create(
+            text='Старый пост', author=self.author,
+            image=SimpleUploadedFile('old.jpg', make_photo(), 'image/jpeg'),
+        )
+        call_command('ingest_images', workers=0, verbosity=0)
+        post.refresh_from_db()
+        self.assertTrue(is_ingested(post.image.name))
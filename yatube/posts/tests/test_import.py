@@ -0,0 +1,129 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Group, Post, Profile
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+def ndjson(*rows):
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_posts', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_posts(self):
+        """Даты сохраняются, пост находится поиском, счётчики верны"""
+        path = self.write('posts.ndjson', ndjson(
+            {'id': 500, 'text': 'Старые котики', 'author': 'author',
+             'group': 'group', 'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'text': 'Без даты', 'author': 'author'},
+        ))
+        self.run_import(path, batch_size=1, commit_every=1)
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(list(search_posts(Post.objects.all(), 'котик')),
+                         [post])
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 2)
+        # последовательность id сдвинута за импортированные
+        self.assertGreater(
+            Post.objects.create(text='Новый', author=self.author).pk, 500)
+
+    def test_invalid_rows_reported(self):
+        """Ошибочные строки пропускаются с номером строки"""
+        path = self.write('posts.ndjson', ndjson(
+            {'text': 'Хороший', 'author': 'author'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {'text': 'Без группы', 'author': 'author', 'group': 'nope'},
+            {'text': '', 'author': 'author'},
+            {'text': 'Дата', 'author': 'author', 'pub_date': 'вчера'},
+        ) + 'не json\n')
+        _, err = self.run_import(path)
+        self.assertEqual(Post.objects.count(), 1)
+        for number in range(2, 7):
+            self.assertIn(f'Строка {number}:', err)
+
+    def test_resume(self):
+        """Повторный запуск продолжает с сохранённой строки"""
+        path = self.write('posts.ndjson', ndjson(
+            *({'id': pk, 'text': f'Пост {pk}', 'author': 'author'}
+              for pk in range(1, 6))))
+        self.write('posts.ndjson.state', '3')
+        out, _ = self.run_import(path, commit_every=2)
+        self.assertIn('Продолжаем со строки 4', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)), [4, 5])
+        with open(f'{path}.state') as file:
+            self.assertEqual(file.read(), '5')
+        # повтор уже импортированных строк с id ничего не дублирует
+        os.remove(f'{path}.state')
+        self.run_import(path)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_import_comments(self):
+        """Комментарии импортируются с датой, без поста — ошибка"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write('comments.ndjson', ndjson(
+            {'post': post.pk, 'text': 'Да', 'author': 'author',
+             'created': '2016-01-01T00:00:00'},
+            {'post': 0, 'text': 'Нет', 'author': 'author'},
+        ))
+        _, err = self.run_import(path, model='comments')
+        comment = Comment.objects.get()
+        self.assertEqual(comment.created.year, 2016)
+        self.assertIn('Нет поста 0', err)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).comments_count, 1)
+
+    def test_replay_without_ids(self):
+        """Повтор строк без id не дублирует посты и не считает их"""
+        path = self.write('posts.ndjson', ndjson(
+            {'text': 'Пост', 'author': 'author',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'text': 'Пост', 'author': 'author',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'text': 'Другой', 'author': 'author',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+        ))
+        out, _ = self.run_import(path)
+        self.assertIn('Импортировано: 2,', out)
+        out, _ = self.run_import(path)
+        self.assertIn('Импортировано: 0,', out)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_model_dates_untouched(self):
+        """Импорт не отключает auto_now_add у модели"""
+        path = self.write('posts.ndjson', ndjson(
+            {'text': 'Старый', 'author': 'author',
+             'pub_date': '2015-03-01T10:00:00+00:00'}))
+        self.run_import(path)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertEqual(Post.objects.get().pub_date.year, 2015)
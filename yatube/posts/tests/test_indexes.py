@@ -0,0 +1,27 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Post
+
+
+class FeedIndexesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_queries_use_indexes(self):
+        """Все запросы лент и страницы поста идут по индексам"""
+        out = StringIO()
+        call_command(
+            'explain_feed_queries', seed=500, batch_size=100,
+            allow_write=True, stdout=out)
+        self.assertIn('Все запросы идут по индексам', out.getvalue())
+
+    @override_settings(DEBUG=False)
+    def test_seed_needs_confirmation(self):
+        """Без DEBUG и --allow-write наполнение базы отклоняется"""
+        with self.assertRaisesMessage(CommandError, '--allow-write'):
+            call_command('explain_feed_queries', seed=10, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
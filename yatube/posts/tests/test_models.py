@@ -1,7 +1,8 @@
 # posts/tests/test_models.py
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
-from ..models import Group, Post
+from ..models import Comment, Group, Post, Profile
 
 User = get_user_model()
 
@@ -64,3 +65,46 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class ProfileCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter')
+        cls.other_user = User.objects.create_user(username='other')
+
+    def assertCounters(self, user, posts_count, comments_count):
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.posts_count, posts_count)
+        self.assertEqual(profile.comments_count, comments_count)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики растут при создании и уменьшаются при удалении"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(
+            author=self.user, post=post, text='Комментарий')
+        self.assertCounters(self.user, 1, 1)
+        comment.delete()
+        self.assertCounters(self.user, 1, 0)
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertCounters(self.user, 0, 0)
+
+    def test_counters_follow_author_change(self):
+        """Смена автора переносит пост в счётчик нового автора"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Post.objects.create(author=self.other_user, text='Пост')
+        post.author = self.other_user
+        post.save()
+        self.assertCounters(self.user, 0, 0)
+        self.assertCounters(self.other_user, 2, 0)
+
+    def test_rebuild_command(self):
+        """Команда пересчёта исправляет разошедшиеся счётчики"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Пост') for _ in range(3))
+        Profile.objects.filter(user=self.user).delete()
+        Profile.objects.create(user=self.other_user, posts_count=5)
+        call_command('rebuild_post_counters', verbosity=0)
+        self.assertCounters(self.user, 3, 0)
+        self.assertCounters(self.other_user, 0, 0)
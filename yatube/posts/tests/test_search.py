@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post, SearchToken
+from posts.search import search_posts, tokenize
+from posts.views import POSTS_AMOUNT
+
+User = get_user_model()
+
+
+class TokenizeTests(TestCase):
+    def test_word_forms_share_token(self):
+        """Формы слова, регистр и ё дают одну основу"""
+        for first, second in (
+            ('Котики', 'котиков'),
+            ('программирование', 'программированием'),
+            ('Ёлка', 'елкой'),
+        ):
+            with self.subTest(word=first):
+                self.assertEqual(tokenize(first), tokenize(second))
+
+    def test_stop_words_are_skipped(self):
+        """Служебные слова не попадают в индекс"""
+        self.assertEqual(tokenize('и в на котики'), ['котик'])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.cats = Post.objects.create(
+            text='Мои котики любят спать', author=self.author)
+        self.dogs = Post.objects.create(
+            text='Собаки любят гулять', author=self.author)
+        self.guest_client = Client()
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит пост по другой форме слов, все слова обязательны"""
+        self.assertEqual(self.search('котиков'), [self.cats])
+        self.assertEqual(
+            set(self.search('ЛЮБИТ')), {self.cats, self.dogs})
+        self.assertEqual(self.search('котик гулять'), [])
+        self.assertEqual(self.search('и'), [])
+
+    def test_frequent_words_scan_feed(self):
+        """Частые слова проверяются через EXISTS с тем же результатом"""
+        with mock.patch('posts.search.POSTING_SORT_LIMIT', 0):
+            self.assertEqual(self.search('котиков'), [self.cats])
+            self.assertEqual(self.search('любят'), [self.dogs, self.cats])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        self.cats.text = 'Теперь про попугаев'
+        self.cats.save()
+        self.assertEqual(self.search('котики'), [])
+        self.assertEqual(self.search('попугай'), [self.cats])
+        self.cats.delete()
+        self.assertFalse(SearchToken.objects.filter(token='попуга').exists())
+
+    def test_rebuild_command(self):
+        """Команда заново строит индекс"""
+        SearchToken.objects.all().delete()
+        call_command('rebuild_search_index', verbosity=0)
+        self.assertEqual(self.search('собака'), [self.dogs])
+
+    def test_search_view_paginates(self):
+        """Страница поиска показывает совпадения и сохраняет запрос"""
+        Post.objects.bulk_create(
+            Post(text=f'Котики номер {index}', author=self.author)
+            for index in range(POSTS_AMOUNT)
+        )
+        call_command('rebuild_search_index', verbosity=0)
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котики'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), POSTS_AMOUNT)
+        self.assertIn(
+            f'?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8&amp;cursor='
+            f'{page_obj.next_cursor}', response.content.decode())
+        second = self.guest_client.get(reverse('posts:search'), {
+            'q': 'котики', 'cursor': page_obj.next_cursor,
+        }).context['page_obj']
+        self.assertEqual(len(second), 1)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через обратный индекс"""
+        request = RequestFactory().get('/')
+        queryset, distinct = admin.site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'котика')
+        self.assertEqual(list(queryset), [self.cats])
+        self.assertFalse(distinct)
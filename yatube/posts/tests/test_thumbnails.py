@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.jobs import process_jobs
+from core.models import Job
+from core.storage import media_storage
+from posts.images import ingest_post_image
+from posts.models import Post
+from posts.thumbnails import (
+    attach_thumbnail_urls, generate_thumbnail, thumbnail_key,
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        })
+        return Post.objects.latest('pk')
+
+    def test_create_enqueues_instead_of_rendering(self):
+        """Создание поста ставит загрузку в очередь, лента её не показывает"""
+        post = self.create_post()
+        self.assertTrue(Job.objects.filter(
+            name=ingest_post_image.name,
+            payload__contains=post.image.name,
+        ).exists())
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertNotIn(post.image.url, content)
+        self.assertNotIn('/media/', content)
+
+    def test_worker_publishes_thumbnail(self):
+        """После обработки очереди лента показывает миниатюру"""
+        post = self.create_post()
+        self.client.get(reverse('posts:index'))
+        # обработка загрузки и миниатюра обработанной картинки
+        self.assertEqual(process_jobs(), 2)
+        post.refresh_from_db()
+        job = Job.objects.get(
+            name=generate_thumbnail.name, payload__contains=post.image.name)
+        self.assertEqual(job.status, Job.DONE)
+        url = cache.get(thumbnail_key(post.image.name))
+        self.assertTrue(url.startswith('/media/cache/'))
+        self.assertEqual(job.result_value, url)
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn(url, content)
+
+    def test_backfill_command(self):
+        """Команда строит миниатюры для уже загруженных картинок"""
+        post = Post.objects.create(
+            text='Старый пост', author=self.author,
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'),
+        )
+        out = StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=out)
+        self.assertIsNotNone(cache.get(thumbnail_key(post.image.name)))
+        self.assertIn('Построено миниатюр: 1', out.getvalue())
+        # пропущенные картинки в итог не попадают
+        out = StringIO()
+        with mock.patch.object(generate_thumbnail, 'func', return_value=None):
+            call_command('generate_thumbnails', workers=0, force=True,
+                         stdout=out)
+        self.assertIn('Построено миниатюр: 0', out.getvalue())
+
+    def test_page_resolves_thumbnails_in_one_lookup(self):
+        """Миниатюры страницы берутся из кеша одним get_many"""
+        # хвост после конца GIF делает файлы разными для хранилища;
+        # картинки уже обработаны, загрузки миниатюр не получают
+        posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=self.author,
+                image=media_storage.save(
+                    'posts/image.gif',
+                    ContentFile(SMALL_GIF + bytes([index]))),
+            )
+            for index in range(5)
+        ]
+        cache.set(thumbnail_key(posts[0].image.name), '/media/cache/t.gif')
+        with mock.patch('posts.thumbnails.cache', wraps=cache) as spy:
+            attach_thumbnail_urls(posts)
+        self.assertEqual(spy.get_many.call_count, 1)
+        spy.get.assert_not_called()
+        self.assertEqual(posts[0].thumbnail_url, '/media/cache/t.gif')
+        self.assertEqual(posts[1].thumbnail_url, posts[1].image.url)
+        self.assertEqual(Job.objects.count(), 4)
+        attach_thumbnail_urls(posts)
+        self.assertEqual(Job.objects.count(), 4)
@@ -2,6 +2,7 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.cache import cache
 from posts.models import Post, Group
 from http import HTTPStatus
 
@@ -25,6 +26,7 @@ class PostsURLTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.user = User.objects.create_user(username='HasNoName')
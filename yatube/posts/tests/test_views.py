@@ -10,6 +10,9 @@ from posts.models import Post, Group, User
 from posts.forms import PostForm
 from django.core.paginator import Page
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from core.db.inspector import query_budget
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -55,6 +58,7 @@ class PostsViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostsViewsTests.post.author)
@@ -254,6 +258,7 @@ class PaginatorViewsTest(TestCase):
         cls.post = PaginatorViewsTest.posts[0]
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def page_contain_ten_records(self, response):
@@ -286,3 +291,79 @@ class PaginatorViewsTest(TestCase):
         self.page_contain_ten_records(
             response=response
         )
+
+
+class PostsQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            description='Описание',
+            title='Имя',
+            slug='test-slug'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{i}', first_name='Имя', last_name=str(i)
+            )
+            for i in range(POSTS_PER_PAGE)
+        ]
+        Post.objects.bulk_create(
+            Post(text='Текст', author=author, group=PostsQueriesTests.group)
+            for author in PostsQueriesTests.authors
+        )
+        call_command('rebuild_post_counters', verbosity=0)
+        call_command('rebuild_search_index', verbosity=0)
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feed_pages_have_no_n_plus_one(self):
+        """Число запросов на страницах не растёт с числом постов"""
+        author = PostsQueriesTests.post.author
+        pages_queries = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_list',
+                    kwargs={'slug': PostsQueriesTests.group.slug}): 2,
+            reverse('posts:profile',
+                    kwargs={'username': author.username}): 2,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': PostsQueriesTests.post.pk}): 3,
+        }
+        for url, queries in pages_queries.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_fit_query_budget(self):
+        """Страницы укладываются в бюджет запросов и не делают N+1"""
+        reader = User.objects.create_user(username='reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        for author in PostsQueriesTests.authors:
+            reader_client.get(reverse(
+                'posts:profile_follow', kwargs={'username': author.username}))
+        cache.clear()
+        author = PostsQueriesTests.post.author
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': PostsQueriesTests.group.slug})
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': author.username})
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': PostsQueriesTests.post.pk})
+        pages_budgets = {
+            reverse('posts:index'): (self.guest_client, 1),
+            group_url: (self.guest_client, 2),
+            profile_url: (self.guest_client, 2),
+            post_url: (self.guest_client, 3),
+            reverse('posts:search') + '?q=Текст': (self.guest_client, 2),
+            reverse('posts:follow_index'): (reader_client, 4),
+        }
+        for url, (client, budget) in pages_budgets.items():
+            with self.subTest(url=url):
+                with query_budget(budget, threshold=3):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,93 @@
+import hashlib
+
+from django.core.cache import cache
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import task
+from core.metrics import histogram, timer
+from core.storage import is_private
+
+from .cache import bump_feed_version, invalidate_post_cards
+from .models import Post
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+QUEUED_TIMEOUT = 60 * 5
+THUMBNAIL_SECONDS = histogram(
+    'yatube_thumbnail_generation_seconds', 'Время построения миниатюры.')
+
+
+def thumbnail_key(image_name):
+    digest = hashlib.md5(image_name.encode()).hexdigest()
+    return f'thumbnail:{THUMBNAIL_GEOMETRY}:{digest}'
+
+
+def queued_key(image_name):
+    return f'{thumbnail_key(image_name)}:queued'
+
+
+def thumbnail_url(image):
+    """URL готовой миниатюры или оригинала, пока миниатюра не готова.
+
+    Необработанная загрузка наружу не показывается: пустая строка.
+    """
+    if not image or is_private(image.name):
+        return ''
+    url = cache.get(thumbnail_key(image.name))
+    if url is None:
+        enqueue_thumbnail(image.name)
+        return image.url
+    return url
+
+
+def attach_thumbnail_urls(posts):
+    """Проставляет post.thumbnail_url всей странице одним get_many."""
+    posts = [post for post in posts if post.image]
+    for post in posts:
+        if is_private(post.image.name):
+            # миниатюру поставит в очередь обработка загрузки
+            post.thumbnail_url = ''
+    posts = [post for post in posts if not is_private(post.image.name)]
+    names = {post.image.name for post in posts}
+    found = cache.get_many(
+        [thumbnail_key(name) for name in names]
+        + [queued_key(name) for name in names]
+    )
+    missing = set()
+    for post in posts:
+        name = post.image.name
+        post.thumbnail_url = found.get(thumbnail_key(name))
+        if post.thumbnail_url is None:
+            post.thumbnail_url = post.image.url
+            if queued_key(name) not in found:
+                missing.add(name)
+    if missing:
+        cache.set_many(
+            {queued_key(name): True for name in missing}, QUEUED_TIMEOUT)
+        _create_jobs(missing)
+
+
+def enqueue_thumbnail(image_name):
+    """Ставит картинку в очередь; повторные вызовы склеиваются."""
+    if image_name and cache.add(queued_key(image_name), True, QUEUED_TIMEOUT):
+        _create_jobs([image_name])
+
+
+def _create_jobs(image_names):
+    generate_thumbnail.delay_many((name,) for name in image_names)
+
+
+@task
+def generate_thumbnail(image_name):
+    """Строит миниатюру и публикует её URL для шаблонов."""
+    if not Post.objects.filter(image=image_name).exists():
+        # картинку уже заменили обработанной, пока задача ждала
+        return None
+    with timer(THUMBNAIL_SECONDS, span='thumb'):
+        thumbnail = get_thumbnail(
+            image_name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    cache.set(thumbnail_key(image_name), thumbnail.url, None)
+    # карточки и страницы лент закешированы со ссылкой на оригинал
+    invalidate_post_cards(Post.objects.filter(image=image_name))
+    bump_feed_version()
+    return thumbnail.url
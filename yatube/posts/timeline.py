@@ -0,0 +1,184 @@
+"""Лента подписок: раскладка постов по лентам при публикации.
+
+Пост обычного автора при создании записывается в TimelineEntry каждого
+подписчика, и лента читается по индексу (user, -pub_date). Посты
+авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, не
+раскладываются: при чтении они подмешиваются из таблицы постов. Когда
+автор опускается ниже порога, его посты раскладываются задачей
+backfill_followers. Лента хранит TIMELINE_LENGTH последних постов,
+лишнее срезается при раскладке подписки и командой rebuild_timelines
+--trim.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.jobs import task
+from core.paginator import MergedQuerySet
+from .models import Follow, Post, Profile, TimelineEntry
+
+# сколько последних постов хранится и читается в ленте подписчика
+TIMELINE_LENGTH = 1000
+BATCH_SIZE = 1000
+
+
+def is_celebrity(author_id):
+    return Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+@task
+def fan_out(post_id):
+    """Записывает пост в ленты подписчиков; возвращает число записей.
+
+    Ленты, ставшие длиннее TIMELINE_LENGTH, сразу срезаются.
+    """
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date').first()
+    if post is None or is_celebrity(post['author_id']):
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post['author_id']).values_list('user_id', flat=True)
+    total = 0
+    followers = followers.iterator()
+    while True:
+        batch = list(islice(followers, BATCH_SIZE))
+        if not batch:
+            return total
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=post['pub_date'])
+             for user_id in batch),
+            ignore_conflicts=True,
+        )
+        trim_timelines(batch)
+        total += len(batch)
+
+
+def enqueue_fan_out(post):
+    """Ставит раскладку нового поста в очередь, если есть подписчики.
+
+    Задача пишется в той же транзакции, что и пост: после коммита её
+    возьмёт воркер, даже если веб-процесс перезапустится.
+    """
+    if Follow.objects.filter(author_id=post.author_id).exists():
+        fan_out.delay(post.pk)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        ignore_conflicts=True,
+    )
+    trim_timeline(user_id)
+
+
+@task
+def backfill_followers(author_id):
+    """Раскладывает посты автора, опустившегося ниже порога, по лентам.
+
+    Пока он был популярным, его посты подмешивались при чтении и в
+    ленты не попадали; без раскладки они бы из лент пропали.
+    """
+    if is_celebrity(author_id):
+        return 0
+    total = 0
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        with transaction.atomic():
+            backfill(user_id, author_id)
+        total += 1
+    return total
+
+
+def follower_removed(author_id):
+    """Вызывается после отписки: не опустился ли автор ниже порога."""
+    if Profile.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT - 1,
+    ).exists():
+        backfill_followers.delay(author_id)
+
+
+def trim_timeline(user_id):
+    """Удаляет из ленты всё, что старше TIMELINE_LENGTH последних постов."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    boundary = list(entries.order_by('-pub_date', '-post_id').values_list(
+        'pub_date', 'post_id')[TIMELINE_LENGTH:TIMELINE_LENGTH + 1])
+    if not boundary:
+        return 0
+    [(pub_date, post_id)] = boundary
+    deleted, _ = entries.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lte=post_id)
+    ).delete()
+    return deleted
+
+
+def trim_timelines(user_ids=None):
+    """Срезает ленты длиннее TIMELINE_LENGTH; возвращает число записей.
+
+    user_ids — чьи ленты проверять, по умолчанию все.
+    """
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    users = entries.values('user_id').annotate(
+        entries=Count('pk')).filter(entries__gt=TIMELINE_LENGTH).values_list(
+        'user_id', flat=True)
+    return sum(trim_timeline(user_id) for user_id in users.iterator())
+
+
+def follow(user, author):
+    if user == author:
+        return
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(user=user, author=author)
+        if created and not is_celebrity(author.pk):
+            backfill(user.pk, author.pk)
+
+
+def unfollow(user, author):
+    with transaction.atomic():
+        Follow.objects.filter(user=user, author=author).delete()
+        TimelineEntry.objects.filter(
+            user=user, post__author=author).delete()
+
+
+def timeline_posts(user):
+    """Посты ленты подписок в порядке ленты, без JOIN по подпискам."""
+    posts = Post.objects.for_feed()
+    entries = TimelineEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-post_id').values('post_id')[:TIMELINE_LENGTH]
+    timeline = posts.filter(pk__in=entries)
+    celebrities = list(Follow.objects.filter(
+        user=user,
+        author__profile__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if not celebrities:
+        return timeline
+    return MergedQuerySet(
+        timeline, posts.filter(author_id__in=celebrities))
+
+
+def rebuild_timelines(users):
+    """Заново раскладывает ленты пользователей по их подпискам."""
+    total = 0
+    for user_id in users.values_list('pk', flat=True).iterator():
+        with transaction.atomic():
+            TimelineEntry.objects.filter(user_id=user_id).delete()
+            authors = Follow.objects.filter(
+                user_id=user_id).values_list('author_id', flat=True)
+            for author_id in authors:
+                if not is_celebrity(author_id):
+                    backfill(user_id, author_id)
+        total += 1
+    return total
@@ -1,16 +1,37 @@
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.db import transaction
+from django.utils.http import urlencode
+from django.utils.functional import SimpleLazyObject
 from django.shortcuts import get_object_or_404, render, redirect
-from django.views.decorators.cache import cache_page
-from .models import Post, Group, User
+from django.conf import settings
+from core.db.router import use_replica
+from core.paginator import CursorPaginator
+from .cache import (
+    cache_feed_page, conditional_page, feed_etag, get_comments_version,
+    post_etag,
+)
+from .export import EXPORTS, FORMATS, export_lines, parse_since
+from .models import Post, Group, Profile, User
 from .forms import PostForm, CommentForm
+from .images import ingest_post_image
+from .search import search_posts
+from .timeline import follow, timeline_posts, unfollow
 
 POSTS_AMOUNT = 10
+COMMENTS_AMOUNT = 20
+COMMENTS_ORDERING = {
+    'old': ('created', 'pk'),
+    'new': ('-created', '-pk'),
+}
 
 
-@cache_page(20, key_prefix="index_page")
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@cache_feed_page(settings.FEED_CACHE_TIMEOUT, key_prefix="index_page")
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.for_feed()
     page_obj = paginate_posts(request, posts)
     template = 'posts/index.html'
 
@@ -20,11 +41,14 @@ def index(request):
     return render(request, template, context)
 
 
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@cache_feed_page(settings.FEED_CACHE_TIMEOUT, key_prefix="group_page")
 def group_posts(request, slug):
     template = 'posts/group_list.html'
 
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = paginate_posts(request, posts)
 
     context = {
@@ -34,12 +58,16 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+@cache_feed_page(settings.FEED_CACHE_TIMEOUT, key_prefix="profile_page")
 def profile(request, username):
     template = 'posts/profile.html'
 
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    posts_amount = author.posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username)
+    posts = author.posts.for_feed()
+    posts_amount = Profile.objects.for_user(author).posts_count
 
     page_obj = paginate_posts(request, posts)
 
@@ -51,23 +79,59 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@use_replica
+@conditional_page(feed_etag, shared_max_age=settings.FEED_CDN_MAX_AGE)
+def search(request):
+    template = 'posts/search.html'
+
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(Post.objects.for_feed(), query)
+    page_obj = paginate_posts(request, posts)
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'extra_query': urlencode({'q': query}) + '&' if query else '',
+    }
+    return render(request, template, context)
+
+
 def paginate_posts(request, posts):
-    paginator = Paginator(posts, POSTS_AMOUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, POSTS_AMOUNT)
+    page_obj = paginator.get_page(
+        number=request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    )
     return page_obj
 
 
+def comments_paginator(post, order):
+    comments = post.comments.select_related('author').only(
+        'text', 'created', 'post_id', 'author__username')
+    return CursorPaginator(
+        comments, COMMENTS_AMOUNT, ordering=COMMENTS_ORDERING[order])
+
+
+@use_replica
+@conditional_page(post_etag)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
     post_title = post.text[:30]
     post_pub_date = post.pub_date
     author = post.author
-    author_posts_amount = author.posts.all().count()
+    author_posts_amount = Profile.objects.for_user(author).posts_count
     comment_form = CommentForm(request.POST or None)
-    post_comments = post.comments.all()
+    comments_order = request.GET.get('order')
+    if comments_order not in COMMENTS_ORDERING:
+        comments_order = 'old'
+    paginator = comments_paginator(post, comments_order)
+    # курсор входит в ключ кеша блока: берём только разобранный
+    comments_cursor = paginator.clean_cursor(request.GET.get('cursor'))
+    # страница комментариев выбирается, только если блок не в кеше
+    post_comments = SimpleLazyObject(
+        lambda: paginator.get_page(cursor=comments_cursor))
 
     context = {
         "post": post,
@@ -77,6 +141,10 @@ def post_detail(request, post_id):
         "author_posts_amount": author_posts_amount,
         "comment_form": comment_form,
         "comments": post_comments,
+        "comments_order": comments_order,
+        "comments_cursor": comments_cursor,
+        "comments_version": get_comments_version(post.pk),
+        "comments_timeout": settings.COMMENTS_CACHE_TIMEOUT,
     }
 
     return render(request, template, context)
@@ -94,7 +162,10 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            with transaction.atomic():
+                post.save()
+                if post.image:
+                    ingest_post_image.delay(post.image.name)
             return redirect("posts:profile", post.author)
 
     context = {
@@ -120,6 +191,8 @@ def post_edit(request, post_id):
     if request.user == author:
         if request.method == "POST" and form.is_valid:
             post = form.save()
+            if 'image' in form.changed_data and post.image:
+                ingest_post_image.delay(post.image.name)
             return redirect("posts:post_detail", post_id)
 
         context = {
@@ -139,5 +212,56 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@use_replica
+@login_required
+def follow_index(request):
+    template = 'posts/follow.html'
+
+    page_obj = paginate_posts(request, timeline_posts(request.user))
+
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    follow(request.user, author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author)
+    return redirect('posts:profile', username=username)
+
+
+@use_replica
+@staff_member_required
+def export(request):
+    """Потоковая выгрузка: ?model=posts|comments&format=ndjson|csv&since=."""
+    model = request.GET.get('model', 'posts')
+    format = request.GET.get('format', 'ndjson')
+    if model not in EXPORTS or format not in FORMATS:
+        return HttpResponseBadRequest('Неизвестная выгрузка или формат')
+    since = request.GET.get('since')
+    if since:
+        try:
+            since = parse_since(since)
+        except ValueError as error:
+            return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        export_lines(model, format, since or None),
+        content_type=FORMATS[format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{model}.{format}"')
+    return response
@@ -1,8 +1,12 @@
 # users/tests/test_forms.py
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.urls import reverse
 
+from core.jobs import process_jobs
+from core.models import Job
+
 User = get_user_model()
 
 
@@ -59,3 +63,39 @@ class SuccessfulSignUpTests(TestCase):
                 email='email@email.ru'
             ).exists()
         )
+
+
+class QueuedPasswordResetTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='john',
+            email='john@doe.com',
+            password='old_password'
+        )
+        self.response = Client().post(
+            reverse('users:password_reset_form'), {'email': 'john@doe.com'})
+
+    def test_mail_is_queued(self):
+        """Письмо сброса пароля не отправляется в запросе"""
+        self.assertRedirects(
+            self.response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.filter(
+            name='users.tasks.send_password_reset').count(), 1)
+
+    def test_job_has_no_reset_link(self):
+        """В очереди нет ссылки с токеном сброса"""
+        [job] = Job.objects.all()
+        self.assertNotIn('/auth/reset/', job.payload)
+        self.assertNotIn('john@doe.com', job.payload)
+
+    def test_worker_sends_mail(self):
+        """Воркер отправляет письмо со ссылкой сброса"""
+        self.assertEqual(process_jobs(), 1)
+        [message] = mail.outbox
+        self.assertEqual(message.to, ['john@doe.com'])
+        self.assertIn('/auth/reset/', message.body)
+        link = message.body[message.body.index('/auth/reset/'):].split()[0]
+        response = Client().get(link, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['validlink'])
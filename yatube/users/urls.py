@@ -5,6 +5,7 @@ from django.contrib.auth.views import (
     PasswordResetConfirmView, PasswordResetCompleteView)
 from django.urls import path
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -23,7 +24,8 @@ urlpatterns = [
     path(
         'password_reset/',
         PasswordResetView.as_view(
-            template_name='users/password_reset_form.html'),
+            template_name='users/password_reset_form.html',
+            form_class=QueuedPasswordResetForm),
         name='password_reset_form'),
     path(
         'password_reset/done/',
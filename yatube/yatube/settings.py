@@ -23,7 +23,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'ib_ho+)8txg4ajtuq8c^oeahbo_#u&@=2kxtd62g093i(#w89i'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -45,15 +45,18 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,7 +66,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.templates.InstrumentedTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +82,21 @@ TEMPLATES = [
     },
 ]
 
+# Разобранные шаблоны хранятся в памяти процесса: по умолчанию без DEBUG,
+# иначе правки шаблонов видны только после перезапуска. TEMPLATE_WARMUP=1
+# разбирает все шаблоны проекта при старте воркера в yatube/wsgi.py.
+TEMPLATE_CACHE = os.getenv('TEMPLATE_CACHE', str(int(not DEBUG))) == '1'
+TEMPLATE_WARMUP = (
+    os.getenv('TEMPLATE_WARMUP', str(int(TEMPLATE_CACHE))) == '1')
+if TEMPLATE_CACHE:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -91,12 +110,96 @@ DATABASES = {
     }
 }
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Реплики только для чтения: DATABASE_REPLICAS=/srv/r1.sqlite3,/srv/r2.sqlite3
+# Читающие представления (core.db.router.use_replica) идут на случайную
+# реплику, запись и всё после неё — в основную базу.
+DATABASE_REPLICAS = []
+for index, name in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+# Соединения живут между запросами, а не открываются на каждый
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+DATABASE_ROUTERS = ['core.db.router.PrimaryReplicaRouter']
+# Сколько секунд после записи пользователь читает основную базу
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# Кеш выбирается переменными окружения:
+# CACHE_BACKEND — locmem, file, sqlite или redis;
+# CACHE_LOCATION — каталог, файл или redis://host:port/db;
+# CACHE_TIERED=1 — LRU процесса перед общим кешем на CACHE_LOCAL_TIMEOUT с.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+    'redis': 'core.cache.redis.RedisCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': '',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'sqlite': os.path.join(BASE_DIR, 'cache.sqlite3'),
+    'redis': 'redis://localhost:6379/0',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+SHARED_CACHE = {
+    'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+    'LOCATION': os.getenv(
+        'CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
 }
 
+if os.getenv('CACHE_TIERED') == '1':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+            },
+        },
+        'shared': SHARED_CACHE,
+    }
+else:
+    CACHES = {
+        'default': SHARED_CACHE,
+    }
+
+# Чтения кеша по умолчанию считаются для /metrics по префиксам ключей
+CACHES['instrumented'] = CACHES['default']
+CACHES['default'] = {
+    'BACKEND': 'core.cache.instrumented.InstrumentedCache',
+    'LOCATION': 'instrumented',
+    'OPTIONS': {
+        'KINDS': {
+            'feed_body:': 'page',
+            'personal:': 'page_header',
+            'personal_version:': 'version',
+            'template.cache.': 'fragment',
+            'post_card:': 'post_card',
+            'thumbnail:': 'thumbnail',
+            'feed_version': 'version',
+            'comments_version:': 'version',
+        },
+    },
+}
+
+# Карточки постов версионируются датой изменения и сбрасываются сигналами,
+# поэтому их и страницы лент можно держать в кеше долго
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_TIMEOUT = 60 * 60
+COMMENTS_CACHE_TIMEOUT = 60 * 60 * 24
+# Шапка и кнопка подписки кешируются на сессию отдельно от тела ленты
+PERSONAL_CACHE_TIMEOUT = 60 * 60
+# Сколько секунд CDN может отдавать анонимную ленту без перепроверки
+FEED_CDN_MAX_AGE = 20
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -135,6 +238,14 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+# Без DEBUG статику и медиа отдаёт FileServer из yatube/wsgi.py, а
+# collectstatic (обязателен перед запуском) даёт статике имена с хешем
+# и кладёт рядом сжатые копии: такие файлы кешируются бессрочно
+SERVE_FILES = os.getenv('SERVE_FILES', str(int(not DEBUG))) == '1'
+if SERVE_FILES:
+    STATICFILES_STORAGE = 'core.serving.storage.CompressedManifestStorage'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -143,5 +254,62 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Каталоги MEDIA_ROOT, которые не отдаются наружу: необработанные загрузки
+# с метаданными лежат там, пока их не обработает фоновая задача
+MEDIA_PRIVATE_PREFIXES = ('posts/incoming/',)
+
+# Загруженные картинки постов уменьшаются до IMAGE_MAX_SIZE пикселей по
+# большей стороне и перекодируются в IMAGE_FORMAT (JPEG или WEBP)
+IMAGE_MAX_SIZE = int(os.getenv('IMAGE_MAX_SIZE', 2048))
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'JPEG').upper()
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 85))
+
+# Фоновые задачи core.jobs (миниатюры, письма) разбирает команда
+# run_workers; JOBS_INLINE_WORKERS потоков веб-процесса вдобавок берут
+# задачи сразу после коммита — для разработки без отдельного воркера.
+# Результаты выполненных задач хранятся JOB_RESULT_DAYS дней.
+JOBS_INLINE_WORKERS = int(os.getenv('JOBS_INLINE_WORKERS', int(DEBUG) * 2))
+JOB_RESULT_DAYS = int(os.getenv('JOB_RESULT_DAYS', 7))
+
+# Новый пост раскладывается по лентам подписчиков задачей core.jobs.
+# Авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+# читатели подмешивают в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', 5000))
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# QueryInspectorMiddleware ищет в запросах N+1 — одну форму SQL из одного
+# места N_PLUS_ONE_THRESHOLD раз и больше — и SQL дольше SLOW_QUERY_SECONDS
+QUERY_INSPECTOR = os.getenv('QUERY_INSPECTOR', str(int(DEBUG))) == '1'
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_SECONDS', 0.1))
+if QUERY_INSPECTOR:
+    MIDDLEWARE.insert(1, 'core.db.middleware.QueryInspectorMiddleware')
+
+# Запросы дольше этого пишутся в лог core.metrics.middleware как WARNING,
+# остальные — как INFO; REQUEST_LOG_LEVEL=INFO включает лог всех запросов
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING'),
+        },
+        'core.db': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'core.jobs': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}